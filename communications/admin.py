@@ -5,7 +5,7 @@ from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.utils import timezone
 
-from .models import Announcement
+from .models import Announcement, EmailJob, OutboundEmail
 
 
 @admin.register(Announcement)
@@ -35,3 +35,36 @@ class AnnouncementAdmin(admin.ModelAdmin):
                 {"workflow": "announcement", "announcement": obj.id})
             return HttpResponseRedirect(url)
         return super().response_change(request, obj)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Read-only log of what the email workflows sent."""
+
+    list_display = ("sent_at", "workflow", "target", "recipient", "subject")
+    list_filter = ("workflow",)
+    search_fields = ("recipient", "subject")
+    date_hierarchy = "sent_at"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EmailJob)
+class EmailJobAdmin(admin.ModelAdmin):
+    """Queued review-page sends (EMAIL_SEND_ASYNC). Read-only; the worker
+    owns the status and counters."""
+
+    list_display = ("created_at", "workflow", "status", "sent", "failed", "total",
+                    "created_by")
+    list_filter = ("status", "workflow")
+    list_select_related = ("created_by",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
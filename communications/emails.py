@@ -27,16 +27,26 @@ Markdown. ``build_messages`` applies per-group subject/body overrides (the edits
 from the review form, falling back to the draft's own templates), renders each
 recipient's copy, and returns ``EmailMultiAlternatives`` objects carrying a
 clean plain-text body plus an HTML alternative rendered from the Markdown. The
-per-app ``utils`` send functions own the actual ``send_messages`` call.
+per-app ``utils`` send functions own the actual ``send_messages`` call, which
+records each message in the ``OutboundEmail`` log so a retried send skips the
+recipients it already reached. On an anymail backend, recipients of a group
+are batched into one message with per-recipient ``merge_data`` (one Brevo API
+call per ``BATCH_SIZE`` recipients instead of one per email).
 Placeholder substitution is forgiving: an unknown or fumbled ``{token}`` renders
 blank rather than raising.
 """
 
+import hashlib
 import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
 
-import markdown as md
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from .models import OutboundEmail
 
 _PLACEHOLDER = re.compile(r"\{(\w+)\}")
 
@@ -64,6 +74,9 @@ def to_html(text):
     """Render Markdown ``text`` to a standalone HTML document. Single newlines
     become ``<br>`` (``nl2br``) so bodies authored as plain paragraphs keep
     their line breaks; ``extra`` covers links, lists, bold/italic, etc."""
+    # Imported on first render so processes that never send mail skip it.
+    import markdown as md
+
     inner = md.markdown(text or "", extensions=["extra", "nl2br", "sane_lists"])
     return _HTML_TEMPLATE.format(inner=inner)
 
@@ -85,33 +98,285 @@ def to_text(text):
 # --- message building / sending --------------------------------------------
 
 
-def build_messages(groups, edits=None):
+def build_messages(groups, edits=None, workflow=None, target=None):
     """Turn draft groups into ``EmailMultiAlternatives`` (plain-text body + HTML
     alternative), applying ``edits`` (``{group_key: {"subject": ..., "body":
-    ...}}``) over the defaults."""
+    ...}}``) over the defaults.
+
+    With ``workflow`` (and the draft's ``target``), each message is tagged for
+    the OutboundEmail log, and recipients already sent an identical message
+    for the same workflow and target within ``DEDUP_WINDOW`` are skipped — so
+    retrying a half-finished send only mails the rest.
+
+    When the backend can batch (see ``batch_send_enabled``), recipients of a
+    group who share a subject go out as one message per ``BATCH_SIZE`` with
+    per-recipient ``merge_data``; anyone the batch template can't reproduce
+    exactly gets their own message as before."""
     edits = edits or {}
     sender = settings.DEFAULT_FROM_EMAIL
+    target = target_key(target)
+    already_sent = _recently_sent(workflow, target) if workflow else set()
+    batching = batch_send_enabled()
+
+    def log_rows(items):
+        if not workflow:
+            return []
+        return [OutboundEmail(workflow=workflow, target=target, recipient=i.email,
+                              content_hash=i.digest, subject=i.subject[:255])
+                for i in items]
+
     out = []
     for group in groups:
         override = edits.get(group["key"], {})
         subject_t = override.get("subject") or group["subject"]
         body_t = override.get("body") or group["body"]
+        pending = []
         for r in group["recipients"]:
-            subject = render(subject_t, r["context"])
-            body_md = render(body_t, r["context"])
+            item = _Rendered(r, render(subject_t, r["context"]),
+                             render(body_t, r["context"]))
+            if workflow:
+                item.digest = content_hash(item.subject, item.body_md)
+                if (item.email, item.digest) in already_sent:
+                    continue
+            pending.append(item)
+        if batching:
+            batches, pending = _batch_messages(body_t, pending, sender)
+            for msg, items in batches:
+                msg.outbound_logs = log_rows(items)
+                out.append(msg)
+        for item in pending:
             msg = EmailMultiAlternatives(
-                subject, to_text(body_md), sender, [r["email"]])
-            msg.attach_alternative(to_html(body_md), "text/html")
+                item.subject, to_text(item.body_md), sender, [item.email])
+            msg.attach_alternative(to_html(item.body_md), "text/html")
+            msg.outbound_logs = log_rows([item])
             out.append(msg)
     return out
 
 
+class _Rendered:
+    """One recipient's rendered subject and Markdown body."""
+
+    def __init__(self, recipient, subject, body_md):
+        self.email = recipient["email"]
+        self.context = recipient["context"]
+        self.subject = subject
+        self.body_md = body_md
+        self.digest = ""
+
+
+# --- batch sending -----------------------------------------------------------
+#
+# An anymail message with ``merge_data`` is a batch send: Brevo bursts its
+# ``to`` list into one ``messageVersions`` entry per recipient, each with its
+# own ``params``, so every recipient sees only their own address and the body's
+# ``{{params.x}}`` tokens are filled in by Brevo. Only the per-recipient values
+# that differ within a group become params; shared values are rendered into
+# the template as usual.
+
+# Recipients per batch message (one API call each).
+BATCH_SIZE = 100
+
+# Values that Brevo's template language might escape or interpret; recipients
+# with such a value get an individual message instead.
+_UNSAFE_PARAM_CHARS = set("&<>\"'{}")
+_BREVO_SYNTAX = re.compile(r"\{[{%#]")
+
+
+def batch_send_enabled():
+    """Batch sends need an anymail backend (Brevo in production) and can be
+    turned off with ``EMAIL_BATCH_SEND``; console/SMTP backends always get one
+    message per recipient."""
+    return (getattr(settings, "EMAIL_BATCH_SEND", True)
+            and settings.EMAIL_BACKEND.startswith("anymail."))
+
+
+def _param_token(key):
+    return "{{params.%s}}" % key
+
+
+def _fill(template, values):
+    for key, value in values.items():
+        template = template.replace(_param_token(key), value)
+    return template
+
+
+def _batch_messages(body_t, items, sender):
+    """Split ``items`` into ``(batches, leftovers)``: ``batches`` pairs each
+    ``AnymailMessage`` with the items it covers; ``leftovers`` still need an
+    individual message. A recipient joins a batch only if filling the batch
+    template with their params reproduces their own rendering exactly."""
+    from anymail.message import AnymailMessage
+
+    by_subject = {}
+    for item in items:
+        by_subject.setdefault(item.subject, []).append(item)
+    batches, leftovers = [], []
+    for subject, same in by_subject.items():
+        template = None
+        if len(same) > 1 and not _BREVO_SYNTAX.search(subject):
+            template = _batch_template(body_t, same)
+        matched = []
+        for item in same:
+            values = _batch_params(item, template)
+            if values is None:
+                leftovers.append(item)
+            else:
+                matched.append((item, values))
+        if len(matched) < 2:
+            leftovers.extend(item for item, _ in matched)
+            continue
+        text_t, html_t, _ = template
+        for start in range(0, len(matched), BATCH_SIZE):
+            chunk = matched[start:start + BATCH_SIZE]
+            msg = AnymailMessage(
+                subject, text_t, sender, [item.email for item, _ in chunk],
+                merge_data={item.email: values for item, values in chunk})
+            msg.attach_alternative(html_t, "text/html")
+            batches.append((msg, [item for item, _ in chunk]))
+    return batches, leftovers
+
+
+def _batch_template(body_t, items):
+    """``(text, html, params)`` for ``body_t`` with the placeholders whose values
+    differ across ``items`` left as Brevo ``{{params.pN}}`` tokens, where
+    ``params`` maps each token key to its placeholder name. None if the shared
+    text already contains Brevo template syntax."""
+    names = sorted(set(_PLACEHOLDER.findall(body_t or "")))
+    first = items[0].context
+    varying = [n for n in names
+               if any(str(i.context.get(n, "")) != str(first.get(n, "")) for i in items)]
+    params = {f"p{n}": name for n, name in enumerate(varying)}
+    shared = {n: first.get(n, "") for n in names if n not in varying}
+    if _BREVO_SYNTAX.search(render(body_t, shared)):
+        return None
+    body_md = render(body_t, {**shared, **{
+        name: _param_token(key) for key, name in params.items()}})
+    return to_text(body_md), to_html(body_md), params
+
+
+def _batch_params(item, template):
+    """``item``'s params for ``template``, or None if it needs its own message."""
+    if template is None:
+        return None
+    text_t, html_t, params = template
+    values = {key: str(item.context.get(name, "")) for key, name in params.items()}
+    if any(_UNSAFE_PARAM_CHARS & set(v) for v in values.values()):
+        return None
+    if (_fill(text_t, values) != to_text(item.body_md)
+            or _fill(html_t, values) != to_html(item.body_md)):
+        return None
+    return values
+
+
 def send_messages(messages):
-    """Send pre-built ``EmailMultiAlternatives`` over a single connection.
-    Returns the number of messages accepted for delivery."""
+    """Send pre-built ``EmailMultiAlternatives`` over a single connection and
+    log the tagged ones (see ``build_messages``) as OutboundEmail rows, a
+    chunk at a time. If the backend fails part-way, recipients it reports as
+    accepted (anymail's per-recipient status) are still logged before
+    re-raising. Inside ``report_progress`` the counts are passed on as each
+    chunk goes out. Counts are per recipient, so a batch message counts once
+    for each address. Returns the number of recipients accepted for delivery."""
     if not messages:
         return 0
-    return get_connection().send_messages(messages) or 0
+    progress = _progress.get()
+    if progress:
+        progress.add_total(sum(len(m.to) for m in messages))
+    connection = get_connection()
+    sent = 0
+    with connection:
+        for start in range(0, len(messages), SEND_CHUNK_SIZE):
+            chunk = messages[start:start + SEND_CHUNK_SIZE]
+            attempted = sum(len(m.to) for m in chunk)
+            try:
+                connection.send_messages(chunk)
+            except Exception:
+                ok = _log_sent(chunk, sent_by_default=False)
+                if progress:
+                    progress.advance(ok, attempted - ok)
+                raise
+            ok = _log_sent(chunk, sent_by_default=True)
+            if progress:
+                progress.advance(ok, attempted - ok)
+            sent += ok
+    return sent
+
+
+# Messages handed to the backend per call; progress and the OutboundEmail log
+# are updated after each chunk.
+SEND_CHUNK_SIZE = 25
+
+_progress = ContextVar("email_send_progress", default=None)
+
+
+@contextmanager
+def report_progress(reporter):
+    """Within the block, ``send_messages`` calls ``reporter.add_total(n)``
+    before sending and ``reporter.advance(sent, failed)`` after each chunk."""
+    token = _progress.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _progress.reset(token)
+
+
+# Identical messages to the same recipient within this window are treated as
+# duplicates (a retry); older ones as a deliberate re-send.
+DEDUP_WINDOW = timedelta(hours=12)
+
+
+def target_key(target):
+    """Stable string for a draft's ``target`` dict, e.g. ``meeting=12``."""
+    if not target:
+        return ""
+    parts = []
+    for key in sorted(target):
+        value = target[key]
+        if isinstance(value, (list, tuple)):
+            value = ",".join(str(v) for v in sorted(value))
+        parts.append(f"{key}={value}")
+    return ";".join(parts)
+
+
+def content_hash(subject, body):
+    return hashlib.sha256(f"{subject}\0{body}".encode()).hexdigest()
+
+
+def _recently_sent(workflow, target):
+    return set(
+        OutboundEmail.objects.filter(
+            workflow=workflow, target=target,
+            sent_at__gte=timezone.now() - DEDUP_WINDOW,
+        ).values_list("recipient", "content_hash")
+    )
+
+
+_REJECTED = {"failed", "invalid", "rejected"}
+
+
+def _accepted(message, sent_by_default):
+    """Addresses in ``message.to`` the backend accepted. Uses anymail's
+    per-recipient status when present; otherwise all or none of them,
+    per ``sent_by_default``."""
+    status = getattr(message, "anymail_status", None)
+    per_recipient = getattr(status, "recipients", None)
+    if per_recipient:
+        return {email for email, s in per_recipient.items()
+                if s.status not in _REJECTED}
+    if status and status.status:
+        return set() if status.status <= _REJECTED else set(message.to)
+    return set(message.to) if sent_by_default else set()
+
+
+def _log_sent(messages, sent_by_default):
+    """Log the accepted recipients of ``messages``; returns how many there were."""
+    rows, count = [], 0
+    for m in messages:
+        accepted = _accepted(m, sent_by_default)
+        count += len(accepted)
+        rows += [r for r in getattr(m, "outbound_logs", ()) if r.recipient in accepted]
+    if rows:
+        OutboundEmail.objects.bulk_create(rows)
+    return count
 
 
 def send_simple(subject, body_md, to_email):
@@ -134,20 +399,9 @@ def total_recipients(groups):
 
 
 def _announcement_recipients(announcement):
-    from django.contrib.auth import get_user_model
-
-    User = get_user_model()
-    if announcement.audience == "officers":
-        qs = User.objects.filter(is_officer=True, is_active=True)
-    elif announcement.audience == "guests":
-        qs = User.objects.filter(is_guest=True, is_active=True)
-    else:
-        qs = User.objects.filter(is_active=True, is_guest=False)
-    return [
-        {"email": u.email, "name": str(u),
-         "context": {"first_name": u.first_name}}
-        for u in qs if u.email
-    ]
+    from .recipients import audience, recipients
+
+    return recipients(audience(announcement.audience))
 
 
 def build_announcement_draft(announcement, back_url=""):
@@ -156,6 +410,7 @@ def build_announcement_draft(announcement, back_url=""):
         "workflow": "announcement",
         "title": f"Send announcement: {announcement.subject}",
         "back_url": back_url,
+        "target": {"announcement": announcement.id},
         "groups": [{
             "key": "all",
             "label": f"{announcement.get_audience_display()} ({len(recipients)})",
@@ -0,0 +1,121 @@
+"""
+Queued sends from the review-before-send page.
+
+With ``EMAIL_SEND_ASYNC`` on, confirming a draft creates an ``EmailJob`` and
+the officer lands on its status page; the ``run_email_jobs`` worker claims
+queued jobs, rebuilds each draft from its stored params, sends it, and keeps
+the sent/failed counters current for the page to poll.
+
+A job left "running" by a worker that died is requeued once its heartbeat is
+older than ``STALE_AFTER``, but only if it started within ``DEDUP_WINDOW``: the
+OutboundEmail log then makes ``build_messages`` skip recipients who already
+got the same email. Older jobs, and "inline" jobs whose request was killed
+(EMAIL_SEND_ASYNC off), are marked failed instead, so an old email is never
+sent to the whole list again without an officer deciding to.
+"""
+
+import logging
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.db.models import F
+from django.http import QueryDict
+from django.utils import timezone
+
+from .emails import DEDUP_WINDOW, report_progress
+from .models import EmailJob
+from .workflows import resolve_workflow
+
+logger = logging.getLogger(__name__)
+
+# A running job whose worker hasn't reported for this long is presumed dead.
+# Progress is reported after every chunk of SEND_CHUNK_SIZE messages.
+STALE_AFTER = timedelta(minutes=10)
+
+CHECK_LOG = "Check the outbound email log before sending it again."
+
+
+class _JobProgress:
+    """``report_progress`` reporter writing counts straight to the job row."""
+
+    def __init__(self, job):
+        self.job = job
+
+    def add_total(self, n):
+        self._bump(total=n)
+
+    def advance(self, sent, failed):
+        self._bump(sent=sent, failed=failed)
+
+    def _bump(self, **counts):
+        EmailJob.objects.filter(pk=self.job.pk).update(
+            heartbeat_at=timezone.now(),
+            **{k: F(k) + v for k, v in counts.items() if v})
+
+
+def requeue_stale_jobs():
+    """Settle jobs whose sender stopped reporting: requeue a worker's job that
+    the dedup log still covers, fail the rest. Returns how many were
+    requeued."""
+    now = timezone.now()
+    stale = EmailJob.objects.filter(heartbeat_at__lt=now - STALE_AFTER)
+    requeued = stale.filter(
+        status="running", started_at__gte=now - DEDUP_WINDOW,
+    ).update(status="queued")
+    expired = stale.filter(status="running").update(
+        status="failed", finished_at=now,
+        result=f"The worker sending this email stopped, too long ago to retry "
+               f"safely. {CHECK_LOG}")
+    abandoned = stale.filter(status="inline").update(
+        status="failed", finished_at=now,
+        result=f"The request sending this email stopped before it finished. "
+               f"{CHECK_LOG}")
+    if requeued:
+        logger.warning("Requeued %s email job(s) left running by a dead worker",
+                       requeued)
+    if expired or abandoned:
+        logger.warning("Failed %s abandoned email job(s) without retrying",
+                       expired + abandoned)
+    return requeued
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running and return it, or None.
+    Uses a conditional UPDATE, so concurrent workers never take the same job.
+    Stale running jobs are requeued first."""
+    requeue_stale_jobs()
+    while True:
+        pk = (EmailJob.objects.filter(status="queued")
+              .order_by("created_at", "id").values_list("pk", flat=True).first())
+        if pk is None:
+            return None
+        now = timezone.now()
+        claimed = EmailJob.objects.filter(pk=pk, status="queued").update(
+            status="running", started_at=now, heartbeat_at=now)
+        if claimed:
+            return EmailJob.objects.get(pk=pk)
+
+
+def run_job(job, draft=None):
+    """Send ``job``'s draft, recording the outcome on the job. The draft is
+    rebuilt from the job unless the caller already built it (the inline
+    path). The counters start from zero: ``send_messages`` reports the real
+    total."""
+    EmailJob.objects.filter(pk=job.pk).update(
+        total=0, sent=0, failed=0, heartbeat_at=timezone.now())
+    params = QueryDict(urlencode(job.params, doseq=True))
+    try:
+        handler = resolve_workflow(job.workflow, params)
+        if handler is None:
+            raise ValueError(f"Unknown email workflow {job.workflow!r}")
+        with report_progress(_JobProgress(job)):
+            result = handler["send"](job.edits, draft)
+    except Exception as e:
+        logger.exception("Email job %s failed", job.pk)
+        status, result = "failed", f"Could not send the email: {e}"
+    else:
+        status = "done"
+    EmailJob.objects.filter(pk=job.pk).update(
+        status=status, result=result, finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
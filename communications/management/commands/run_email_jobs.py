@@ -0,0 +1,44 @@
+"""
+Worker for queued review-page sends (EMAIL_SEND_ASYNC).
+
+Claims queued EmailJobs oldest-first and sends them one at a time, updating
+each job's counters as chunks go out. Several workers can run side by side:
+claiming is a conditional UPDATE, so a job is only ever taken once.
+
+    python manage.py run_email_jobs            # poll forever
+    python manage.py run_email_jobs --once     # drain the queue and exit
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from communications.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Send queued review-page emails (EmailJob), polling for new ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Exit when the queue is empty instead of polling.")
+        parser.add_argument("--interval", type=float, default=2.0,
+                            help="Seconds between polls of an empty queue (default 2).")
+
+    def handle(self, *args, **opts):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if opts["once"]:
+                    return
+                time.sleep(opts["interval"])
+                # Long-running process: drop connections the DB may have
+                # closed while we were idle.
+                close_old_connections()
+                continue
+            self.stdout.write(f"Job {job.pk}: sending {job.workflow}…")
+            job = run_job(job)
+            self.stdout.write(
+                f"Job {job.pk}: {job.get_status_display().lower()} — "
+                f"{job.sent} sent, {job.failed} failed. {job.result}")
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.11 on 2026-10-19 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("communications", "0002_alter_announcement_body"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboundEmail",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("workflow", models.CharField(max_length=30)),
+                ("target", models.CharField(blank=True, max_length=200)),
+                ("recipient", models.EmailField(max_length=254)),
+                ("content_hash", models.CharField(max_length=64)),
+                ("subject", models.CharField(max_length=255)),
+                ("sent_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["workflow", "target", "recipient", "content_hash"],
+                        name="outbound_email_dedup_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 from .utils import send_announcement
@@ -24,3 +25,88 @@ class Announcement(models.Model):
 
     def send(self):
         return send_announcement(self)
+
+
+class OutboundEmail(models.Model):
+    """One row per email a review-gated workflow handed to the mail backend.
+
+    Written in bulk by ``communications.emails.send_messages``. ``build_messages``
+    checks it to skip a recipient who was already sent an identical message
+    (same workflow, target, subject and body) recently, so retrying a send that
+    timed out part-way doesn't email the first half twice.
+    """
+
+    workflow = models.CharField(max_length=30)
+    # The draft's target, e.g. "meeting=12" or "member=3;roles=1,4".
+    target = models.CharField(max_length=200, blank=True)
+    recipient = models.EmailField()
+    # sha256 of the rendered subject and body.
+    content_hash = models.CharField(max_length=64)
+    subject = models.CharField(max_length=255)
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["workflow", "target", "recipient", "content_hash"],
+                name="outbound_email_dedup_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.workflow} → {self.recipient} ({self.sent_at:%Y-%m-%d %H:%M})"
+
+
+class EmailJob(models.Model):
+    """A confirmed review-page send, queued for the ``run_email_jobs`` worker.
+
+    Holds what's needed to rebuild the draft (workflow + target params) and
+    the officer's edits; the worker rebuilds, sends and updates the counters
+    as it goes, which the status page polls.
+    """
+
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Sending"),
+        # Sent inline by the review page's request (EMAIL_SEND_ASYNC off);
+        # never picked up by a worker.
+        ("inline", "Sending now"),
+        ("done", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    workflow = models.CharField(max_length=30)
+    params = models.JSONField(help_text="The workflow's target, as on the review page.")
+    edits = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    result = models.TextField(blank=True, help_text="Outcome shown to the officer.")
+    back_url = models.CharField(max_length=500, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Last progress report from the worker or request sending this job.",
+    )
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="emailjob_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.workflow} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def remaining(self):
+        return max(self.total - self.sent - self.failed, 0)
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
@@ -0,0 +1,48 @@
+"""
+Recipient lists for the email drafts, built in SQL.
+
+Drafts only need an address, a display name and a first name per recipient,
+so these helpers read exactly those columns with ``values_list`` instead of
+instantiating a User for every member the club has. Users without an email
+are dropped in the query.
+"""
+
+from django.contrib.auth import get_user_model
+
+_FIELDS = ("email", "first_name", "last_name", "username")
+
+
+def display_name(first_name, last_name, username):
+    """Same as ``User.__str__``, from bare column values."""
+    if first_name and last_name:
+        return f"{first_name} {last_name}"
+    return first_name or username
+
+
+def recipients(users, context=None):
+    """Draft recipient dicts for the ``users`` queryset. Each recipient's
+    context is ``context`` plus their own ``first_name``."""
+    context = context or {}
+    return [
+        {"email": email, "name": display_name(first, last, username),
+         "context": {**context, "first_name": first}}
+        for email, first, last, username in users.exclude(email="").values_list(*_FIELDS)
+    ]
+
+
+def audience(name):
+    """Active users in an announcement audience: ``officers``, ``guests`` or
+    (anything else) all members."""
+    User = get_user_model()
+    if name == "officers":
+        return User.objects.filter(is_officer=True, is_active=True)
+    if name == "guests":
+        return User.objects.filter(is_guest=True, is_active=True)
+    return User.objects.filter(is_active=True, is_guest=False)
+
+
+def members_without_role(meeting):
+    """Active members holding no role at ``meeting`` — the open-role nudge
+    audience."""
+    return audience("members").exclude(
+        id__in=meeting.roles.filter(user__isnull=False).values("user_id"))
@@ -1,14 +1,25 @@
+import json
+import threading
 from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
 from unittest.mock import patch
 
 from django.core import mail
-from django.test import TestCase
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
 from meetings.models import Meeting, MeetingRole, Role
+from meetings.utils import send_meeting_reminders
 from members.models import User
-from .models import Announcement
+from .emails import DEDUP_WINDOW, build_announcement_draft, render, to_html, to_text
+from .jobs import STALE_AFTER, claim_next_job
+from .models import Announcement, EmailJob, OutboundEmail
+from .recipients import audience, members_without_role, recipients
+from .utils import send_announcement
 
 
 class EmailReviewTest(TestCase):
@@ -285,3 +296,361 @@ class MarkdownRenderingTest(TestCase):
         msg = mail.outbox[0]
         self.assertEqual(msg.body, "Hi Mo 🎉")  # plain text, no markers
         self.assertIn("<strong>Mo</strong>", msg.alternatives[0][0])
+
+
+class RecipientsTest(TestCase):
+    """Recipient lists come straight from ``values_list`` — no User objects."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            username="alice", email="alice@example.com",
+            first_name="Alice", last_name="Smith")
+        self.bob = User.objects.create_user(
+            username="bob", email="bob@example.com", first_name="Bob")
+        User.objects.create_user(username="noemail", email="")
+        User.objects.create_user(
+            username="gina", email="gina@example.com", is_guest=True)
+        User.objects.create_user(
+            username="gone", email="gone@example.com", is_active=False)
+
+    def test_members_with_names_and_context(self):
+        rows = recipients(audience("all").order_by("username"), {"theme": "Fall"})
+        self.assertEqual(rows, [
+            {"email": "alice@example.com", "name": "Alice Smith",
+             "context": {"theme": "Fall", "first_name": "Alice"}},
+            {"email": "bob@example.com", "name": "Bob",
+             "context": {"theme": "Fall", "first_name": "Bob"}},
+        ])
+
+    def test_single_query_without_user_instances(self):
+        with self.assertNumQueries(1), \
+                patch.object(User, "__init__", side_effect=AssertionError):
+            rows = recipients(audience("all"))
+        self.assertEqual(len(rows), 2)
+
+    def test_guests_audience(self):
+        rows = recipients(audience("guests"))
+        self.assertEqual([r["name"] for r in rows], ["gina"])
+
+    def test_members_without_role_excludes_assignees(self):
+        meeting = Meeting.objects.create(date=timezone.now() + timedelta(days=3))
+        role = Role.objects.create(name="Timer")
+        MeetingRole.objects.create(meeting=meeting, role=role, user=self.alice)
+        MeetingRole.objects.create(meeting=meeting, role=role)
+        rows = recipients(members_without_role(meeting))
+        self.assertEqual([r["email"] for r in rows], ["bob@example.com"])
+
+
+class OutboundEmailLogTest(TestCase):
+    """Sends are logged in OutboundEmail and identical re-sends are skipped."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            username="alice", email="alice@example.com", first_name="Alice")
+        self.bob = User.objects.create_user(
+            username="bob", email="bob@example.com", first_name="Bob")
+        self.announcement = Announcement.objects.create(
+            subject="News", body="Hi {first_name}!")
+
+    def test_send_logs_each_recipient(self):
+        self.assertEqual(send_announcement(self.announcement), 2)
+        logs = OutboundEmail.objects.order_by("recipient")
+        self.assertEqual(
+            [(o.workflow, o.target, o.recipient) for o in logs],
+            [("announcement", f"announcement={self.announcement.id}", "alice@example.com"),
+             ("announcement", f"announcement={self.announcement.id}", "bob@example.com")])
+        self.assertEqual(len({o.content_hash for o in logs}), 2)  # personalized
+
+    def test_retry_skips_recipients_already_sent(self):
+        send_announcement(self.announcement)
+        carol = User.objects.create_user(
+            username="carol", email="carol@example.com", first_name="Carol")
+        mail.outbox = []
+        self.assertEqual(send_announcement(self.announcement), 1)
+        self.assertEqual(mail.outbox[0].to, [carol.email])
+
+    def test_edited_content_is_not_a_duplicate(self):
+        send_announcement(self.announcement)
+        mail.outbox = []
+        send_announcement(self.announcement, {"all": {"body": "Updated, {first_name}."}})
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_old_sends_outside_window_not_skipped(self):
+        send_announcement(self.announcement)
+        OutboundEmail.objects.update(
+            sent_at=timezone.now() - DEDUP_WINDOW - timedelta(minutes=1))
+        mail.outbox = []
+        send_announcement(self.announcement)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_partial_failure_logs_only_accepted_messages(self):
+        class Status:
+            status = {"sent"}
+
+        def flaky_send(messages):
+            messages[0].anymail_status = Status()
+            raise ConnectionError("timeout")
+
+        with patch("communications.emails.get_connection") as conn:
+            conn.return_value.send_messages.side_effect = flaky_send
+            with self.assertRaises(ConnectionError), \
+                    self.assertLogs("communications.utils", "ERROR"):
+                send_announcement(self.announcement)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_reminder_retry_skips_sent(self):
+        meeting = Meeting.objects.create(date=timezone.now() + timedelta(days=3))
+        MeetingRole.objects.create(
+            meeting=meeting, role=Role.objects.create(name="Timer"), user=self.alice)
+        first = send_meeting_reminders(meeting)
+        self.assertEqual(first, 1)
+        self.assertEqual(send_meeting_reminders(meeting), 0)
+
+
+class EmailJobQueueTest(TestCase):
+    """With EMAIL_SEND_ASYNC, confirming a draft queues an EmailJob; the
+    run_email_jobs worker sends it and the status page reports progress."""
+
+    def setUp(self):
+        self.staff = User.objects.create_superuser("boss", "boss@example.com", "pw")
+        self.client.force_login(self.staff)
+        for i in range(3):
+            User.objects.create_user(
+                f"m{i}", f"m{i}@example.com", "pw", first_name=f"M{i}")
+        self.announcement = Announcement.objects.create(
+            subject="News", body="Hi {first_name}!")
+
+    def _confirm(self):
+        return self.client.post(reverse("email_review"), {
+            "workflow": "announcement", "announcement": self.announcement.id,
+            "subject_all": "Edited news", "body_all": "Hello {first_name}."})
+
+    @override_settings(EMAIL_SEND_ASYNC=True)
+    def test_post_enqueues_and_redirects_to_status(self):
+        resp = self._confirm()
+        job = EmailJob.objects.get()
+        self.assertRedirects(resp, reverse("email_job_status", args=[job.pk]))
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(job.total, 4)      # 3 members + the superuser
+        self.assertEqual(job.edits["all"]["subject"], "Edited news")
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(EMAIL_SEND_ASYNC=True)
+    def test_worker_sends_and_status_reports_progress(self):
+        self._confirm()
+        job = EmailJob.objects.get()
+        call_command("run_email_jobs", "--once", stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertEqual((job.total, job.sent, job.failed), (4, 4, 0))
+        self.assertEqual({m.subject for m in mail.outbox}, {"Edited news"})
+        self.announcement.refresh_from_db()
+        self.assertIsNotNone(self.announcement.sent_at)
+
+        status = self.client.get(
+            reverse("email_job_status", args=[job.pk]), {"format": "json"}).json()
+        self.assertEqual(status["remaining"], 0)
+        self.assertTrue(status["finished"])
+        self.assertIn("to 4 recipients", status["result"])
+        page = self.client.get(reverse("email_job_status", args=[job.pk]))
+        self.assertContains(page, "Sent")
+
+    @override_settings(EMAIL_SEND_ASYNC=True)
+    def test_failed_send_recorded_on_job(self):
+        self._confirm()
+        with patch("communications.emails.get_connection") as conn, \
+                self.assertLogs("communications", "ERROR"):
+            conn.return_value.send_messages.side_effect = ConnectionError("down")
+            call_command("run_email_jobs", "--once", stdout=StringIO())
+        job = EmailJob.objects.get()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.failed, 4)
+        self.assertIn("down", job.result)
+
+    def test_claim_is_exclusive(self):
+        job = EmailJob.objects.create(
+            workflow="announcement", params={"announcement": self.announcement.id})
+        self.assertEqual(claim_next_job().pk, job.pk)
+        self.assertIsNone(claim_next_job())
+
+    def test_sync_mode_still_sends_inline(self):
+        with patch("communications.emails.build_announcement_draft",
+                   wraps=build_announcement_draft) as build:
+            resp = self._confirm()
+        # The draft built to validate the POST is the one sent.
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(len(mail.outbox), 4)
+        job = EmailJob.objects.get()
+        self.assertEqual(job.status, "done")
+        # The total is counted once, so the progress reaches 100%.
+        self.assertEqual((job.total, job.sent, job.remaining), (4, 4, 0))
+        self.assertNotIn("email/jobs", resp["Location"])
+
+    @override_settings(EMAIL_SEND_ASYNC=True)
+    def test_job_left_running_by_dead_worker_is_retried(self):
+        self._confirm()
+        real_send = locmem.EmailBackend.send_messages
+        calls = []
+
+        def dies_on_second_chunk(backend, messages):
+            calls.append(len(messages))
+            if len(calls) == 2:
+                raise SystemExit  # the worker process is killed
+            return real_send(backend, messages)
+
+        with patch("communications.emails.SEND_CHUNK_SIZE", 2), \
+                patch.object(locmem.EmailBackend, "send_messages",
+                             dies_on_second_chunk), \
+                self.assertRaises(SystemExit):
+            call_command("run_email_jobs", "--once", stdout=StringIO())
+        job = EmailJob.objects.get()
+        self.assertEqual((job.status, job.sent), ("running", 2))
+        self.assertEqual(len(mail.outbox), 2)
+
+        # Another worker picks it up once the heartbeat is stale; the two
+        # recipients already sent to are skipped by the OutboundEmail log.
+        EmailJob.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - STALE_AFTER - timedelta(seconds=1))
+        with self.assertLogs("communications.jobs", "WARNING"):
+            call_command("run_email_jobs", "--once", stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(len({m.to[0] for m in mail.outbox}), 4)
+
+    def _stale_job(self, status, started_at=None):
+        stale = timezone.now() - STALE_AFTER - timedelta(seconds=1)
+        return EmailJob.objects.create(
+            workflow="announcement", params={"announcement": self.announcement.id},
+            status=status, started_at=started_at or stale, heartbeat_at=stale)
+
+    def test_inline_job_left_by_killed_request_is_failed_not_retried(self):
+        job = self._stale_job("inline")
+        with self.assertLogs("communications.jobs", "WARNING"):
+            self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIn("request sending this email stopped", job.result)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_dead_job_older_than_dedup_window_is_failed_not_retried(self):
+        job = self._stale_job(
+            "running", started_at=timezone.now() - DEDUP_WINDOW - timedelta(minutes=1))
+        with self.assertLogs("communications.jobs", "WARNING"):
+            self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn("too long ago to retry", job.result)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_running_job_with_recent_heartbeat_is_left_alone(self):
+        job = EmailJob.objects.create(
+            workflow="announcement", params={"announcement": self.announcement.id},
+            status="running", heartbeat_at=timezone.now())
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "running")
+
+
+class _FakeBrevo(BaseHTTPRequestHandler):
+    """Stands in for Brevo's /v3/smtp/email: records each JSON payload and
+    answers like the real API (``messageIds`` for a batch send)."""
+
+    payloads = None
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.payloads.append(payload)
+        versions = payload.get("messageVersions")
+        if versions:
+            body = {"messageIds": [f"<{len(self.payloads)}.{i}@fake>"
+                                   for i in range(len(versions))]}
+        else:
+            body = {"messageId": f"<{len(self.payloads)}@fake>"}
+        data = json.dumps(body).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class BatchSendTest(TestCase):
+    """On the Brevo backend a group goes out as batch API calls with
+    per-recipient merge data, checked against a local fake Brevo API."""
+
+    BODY = "Hi **{first_name}**,\n\nSee you at the [meeting](https://example.com/m)."
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(("127.0.0.1", 0), _FakeBrevo)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings_override = override_settings(
+            EMAIL_BACKEND="anymail.backends.brevo.EmailBackend",
+            ANYMAIL={"BREVO_API_KEY": "test-key",
+                     "BREVO_API_URL": f"http://127.0.0.1:{cls.server.server_port}/v3/"})
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.payloads = _FakeBrevo.payloads = []
+        for name in ("Alice", "Bob", "Carol"):
+            User.objects.create_user(
+                name.lower(), f"{name.lower()}@example.com", first_name=name)
+        self.announcement = Announcement.objects.create(subject="News", body=self.BODY)
+
+    def test_group_sent_as_one_batch_call(self):
+        self.assertEqual(send_announcement(self.announcement), 3)
+        self.assertEqual(len(self.payloads), 1)
+        payload = self.payloads[0]
+        self.assertEqual(payload["subject"], "News")
+        versions = sorted(payload["messageVersions"], key=lambda v: v["to"][0]["email"])
+        self.assertEqual([v["to"][0]["email"] for v in versions],
+                         ["alice@example.com", "bob@example.com", "carol@example.com"])
+        # Brevo's substitution of each version's params gives exactly the
+        # per-recipient rendering.
+        for version, name in zip(versions, ("Alice", "Bob", "Carol")):
+            html, text = payload["htmlContent"], payload["textContent"]
+            for key, value in version["params"].items():
+                html = html.replace("{{params.%s}}" % key, value)
+                text = text.replace("{{params.%s}}" % key, value)
+            body = render(self.BODY, {"first_name": name})
+            self.assertEqual(html, to_html(body))
+            self.assertEqual(text, to_text(body))
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+
+    def test_retry_after_batch_skips_sent(self):
+        send_announcement(self.announcement)
+        self.assertEqual(send_announcement(self.announcement), 0)
+        self.assertEqual(len(self.payloads), 1)
+
+    def test_unsafe_values_get_their_own_message(self):
+        User.objects.create_user("dan", "dan@example.com", first_name="D'Arcy & Co")
+        self.assertEqual(send_announcement(self.announcement), 4)
+        self.assertEqual(len(self.payloads), 2)
+        single = next(p for p in self.payloads if "messageVersions" not in p)
+        self.assertEqual(single["to"], [{"email": "dan@example.com"}])
+        self.assertIn("D'Arcy &amp; Co", single["htmlContent"])
+
+    def test_large_groups_split_by_batch_size(self):
+        with patch("communications.emails.BATCH_SIZE", 2):
+            self.assertEqual(send_announcement(self.announcement), 3)
+        self.assertEqual(
+            sorted(len(p.get("messageVersions", [p])) for p in self.payloads), [1, 2])
+
+    @override_settings(EMAIL_BATCH_SEND=False)
+    def test_batching_can_be_turned_off(self):
+        self.assertEqual(send_announcement(self.announcement), 3)
+        self.assertEqual(len(self.payloads), 3)
+        self.assertTrue(all("messageVersions" not in p for p in self.payloads))
@@ -3,13 +3,15 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def send_announcement(announcement, edits=None):
+def send_announcement(announcement, edits=None, draft=None):
     """Send an announcement to its filtered audience. ``edits`` optionally
-    overrides the subject/body (supplied by the review-before-send page).
-    Returns the number of emails sent."""
+    overrides the subject/body (supplied by the review-before-send page);
+    ``draft`` is the already-built draft, if the caller has one. Returns the
+    number of emails sent."""
     from .emails import build_announcement_draft, build_messages, send_messages
 
-    messages = build_messages(build_announcement_draft(announcement)["groups"], edits)
+    draft = draft or build_announcement_draft(announcement)
+    messages = build_messages(draft["groups"], edits, draft["workflow"], draft["target"])
     try:
         return send_messages(messages)
     except Exception:
@@ -8,114 +8,17 @@ confirm.
 
 import json
 
+from django.conf import settings
 from django.contrib import admin, messages
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import Http404
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse
+from django.utils import timezone
 
 from .emails import render as render_template, to_html, total_recipients
-
-
-def _resolve_handler(workflow, request):
-    """Return a handler dict for ``workflow`` (resolving its target from the
-    request), or None if unknown. 404s if the target doesn't exist."""
-    p = request.POST if request.method == "POST" else request.GET
-
-    if workflow in ("reminders", "feedback"):
-        from meetings.models import Meeting
-        from meetings.emails import build_reminder_draft, build_feedback_draft
-        from meetings.utils import send_meeting_reminders, send_meeting_feedback
-
-        meeting = get_object_or_404(Meeting, pk=p.get("meeting"))
-        params = {"workflow": workflow, "meeting": meeting.id}
-        back = reverse("admin:meetings_meeting_change", args=[meeting.id])
-        if workflow == "reminders":
-            def send(edits):
-                n = send_meeting_reminders(meeting, edits)
-                return f"Sent {n} reminder email{'s' if n != 1 else ''}."
-            return {"params": params, "default_back": back,
-                    "build": lambda: build_reminder_draft(meeting), "send": send}
-
-        def send(edits):
-            fc, gc = send_meeting_feedback(meeting, edits)
-            parts = []
-            if fc:
-                parts.append(f"feedback to {fc} member{'s' if fc != 1 else ''}")
-            if gc:
-                parts.append(f"thank-yous to {gc} guest{'s' if gc != 1 else ''}")
-            return "Sent " + (", ".join(parts) if parts else "nothing") + "."
-        return {"params": params, "default_back": back,
-                "build": lambda: build_feedback_draft(meeting), "send": send}
-
-    if workflow == "register":
-        from meetings.models import Meeting
-        from meetings.emails import build_register_draft
-        from meetings.utils import send_meeting_register_reminders
-
-        meeting = get_object_or_404(Meeting, pk=p.get("meeting"))
-
-        def send(edits):
-            n = send_meeting_register_reminders(meeting, edits)
-            return f"Sent {n} registration reminder{'s' if n != 1 else ''}."
-        return {"params": {"workflow": workflow, "meeting": meeting.id},
-                "default_back": reverse("admin:meetings_meeting_change",
-                                        args=[meeting.id]),
-                "build": lambda: build_register_draft(meeting), "send": send}
-
-    if workflow == "announcement":
-        from django.utils import timezone
-        from .models import Announcement
-        from .emails import build_announcement_draft
-        from .utils import send_announcement
-
-        ann = get_object_or_404(Announcement, pk=p.get("announcement"))
-
-        def send(edits):
-            count = send_announcement(ann, edits)
-            ann.sent_at = timezone.now()
-            ann.save(update_fields=["sent_at"])
-            return f"Sent '{ann.subject}' to {count} recipient{'s' if count != 1 else ''}."
-        return {"params": {"workflow": workflow, "announcement": ann.id},
-                "default_back": reverse("admin:communications_announcement_change",
-                                        args=[ann.id]),
-                "build": lambda: build_announcement_draft(ann), "send": send}
-
-    if workflow == "invite":
-        from members.models import User
-        from meetings.models import Role
-        from meetings.emails import build_invite_draft, role_phrase
-        from meetings.utils import send_role_invite
-
-        member = get_object_or_404(User, pk=p.get("member"))
-        # Roles arrive either as repeated ``role=1&role=2`` (the activity-report
-        # checkboxes) or comma-joined ``roles=1,2`` (round-tripped through the
-        # review form's single hidden field). De-dupe, preserve order.
-        raw = p.getlist("role") or (p.get("roles") or "").split(",")
-        role_ids = []
-        for x in raw:
-            if x.isdigit() and int(x) not in role_ids:
-                role_ids.append(int(x))
-        if not role_ids:
-            raise Http404("No roles selected")
-        roles = [get_object_or_404(Role, pk=rid, show_on_agenda=True)
-                 for rid in role_ids]
-        phrase = role_phrase(roles)
-
-        def send(edits):
-            n = send_role_invite(member, roles, edits)
-            if n:
-                return (f"Invited {member} to take {phrase} "
-                        f"({n} upcoming meeting{'s' if n != 1 else ''} with an open slot).")
-            return (f"Invited {member} to take {phrase} (linked to the sign-up "
-                    f"page; no upcoming meeting currently has these open).")
-        return {"params": {"workflow": workflow, "member": member.id,
-                           "roles": ",".join(str(r.id) for r in roles)},
-                "default_back": reverse(
-                    "admin:members_user_activity_report_detail", args=[member.id]),
-                "build": lambda: build_invite_draft(member, roles), "send": send}
-
-    return None
+from .jobs import run_job
+from .models import EmailJob
+from .workflows import resolve_workflow
 
 
 def _parse_edits(post, groups):
@@ -144,7 +47,8 @@ def _attach_previews(groups):
 @staff_member_required
 def email_review(request):
     workflow = request.POST.get("workflow") or request.GET.get("workflow")
-    handler = _resolve_handler(workflow, request)
+    handler = resolve_workflow(
+        workflow, request.POST if request.method == "POST" else request.GET)
     if handler is None:
         raise Http404("Unknown email workflow")
 
@@ -155,14 +59,30 @@ def email_review(request):
         if "_cancel" in request.POST:
             return redirect(back_url)
         try:
-            edits = _parse_edits(request.POST, handler["build"]()["groups"])
-            result = handler["send"](edits)
+            draft = handler["build"]()
         except Exception as e:
             # e.g. the Zoom API is unreachable while building the register
             # draft — surface the error instead of 500-ing or sending blindly.
             messages.error(request, f"Could not send the email: {e}")
             return redirect(back_url)
-        messages.success(request, result)
+        groups = draft["groups"]
+        job = EmailJob.objects.create(
+            workflow=workflow, params=handler["params"],
+            edits=_parse_edits(request.POST, groups), back_url=back_url,
+            total=total_recipients(groups), created_by=request.user,
+            status="queued" if settings.EMAIL_SEND_ASYNC else "inline",
+            started_at=None if settings.EMAIL_SEND_ASYNC else timezone.now(),
+        )
+        if settings.EMAIL_SEND_ASYNC:
+            # The run_email_jobs worker sends it; the officer watches progress.
+            return redirect("email_job_status", job_id=job.pk)
+        # Send the draft just built rather than building it (and calling Zoom
+        # for the register workflow) a second time.
+        job = run_job(job, draft)
+        if job.status == "done":
+            messages.success(request, job.result)
+        else:
+            messages.error(request, job.result)
         return redirect(back_url)
 
     try:
@@ -179,3 +99,26 @@ def email_review(request):
         "params": handler["params"],
         "total": total_recipients(draft["groups"]),
     })
+
+
+@staff_member_required
+def email_job_status(request, job_id):
+    """Progress of a queued send. The page polls ``?format=json`` until the
+    worker finishes the job."""
+    job = get_object_or_404(EmailJob, pk=job_id)
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "status": job.status,
+            "status_label": job.get_status_display(),
+            "total": job.total,
+            "sent": job.sent,
+            "failed": job.failed,
+            "remaining": job.remaining,
+            "finished": job.finished,
+            "result": job.result,
+        })
+    return render(request, "communications/admin/email_job_status.html", {
+        **admin.site.each_context(request),
+        "title": "Sending email",
+        "job": job,
+    })
@@ -0,0 +1,108 @@
+"""
+The email workflows behind the review-before-send page and the send queue.
+"""
+
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+
+def resolve_workflow(workflow, p):
+    """Return a handler dict for ``workflow``, resolving its target from the
+    ``p`` QueryDict (the review page's GET/POST, or a queued job's params), or
+    None if unknown. 404s if the target doesn't exist.
+
+    ``params`` round-trips the target through the review form and the job
+    queue; ``build`` returns the draft and ``send(edits, draft=None)`` sends
+    it (building it first unless given), returning the message to show the
+    officer."""
+
+    if workflow in ("reminders", "feedback"):
+        from meetings.models import Meeting
+        from meetings.emails import build_reminder_draft, build_feedback_draft
+        from meetings.utils import send_meeting_reminders, send_meeting_feedback
+
+        meeting = get_object_or_404(Meeting, pk=p.get("meeting"))
+        params = {"workflow": workflow, "meeting": meeting.id}
+        back = reverse("admin:meetings_meeting_change", args=[meeting.id])
+        if workflow == "reminders":
+            def send(edits, draft=None):
+                n = send_meeting_reminders(meeting, edits, draft)
+                return f"Sent {n} reminder email{'s' if n != 1 else ''}."
+            return {"params": params, "default_back": back,
+                    "build": lambda: build_reminder_draft(meeting), "send": send}
+
+        def send(edits, draft=None):
+            n = send_meeting_feedback(meeting, edits, draft)
+            return f"Sent {n} feedback and thank-you email{'s' if n != 1 else ''}."
+        return {"params": params, "default_back": back,
+                "build": lambda: build_feedback_draft(meeting), "send": send}
+
+    if workflow == "register":
+        from meetings.models import Meeting
+        from meetings.emails import build_register_draft
+        from meetings.utils import send_meeting_register_reminders
+
+        meeting = get_object_or_404(Meeting, pk=p.get("meeting"))
+
+        def send(edits, draft=None):
+            n = send_meeting_register_reminders(meeting, edits, draft)
+            return f"Sent {n} registration reminder{'s' if n != 1 else ''}."
+        return {"params": {"workflow": workflow, "meeting": meeting.id},
+                "default_back": reverse("admin:meetings_meeting_change",
+                                        args=[meeting.id]),
+                "build": lambda: build_register_draft(meeting), "send": send}
+
+    if workflow == "announcement":
+        from django.utils import timezone
+        from .models import Announcement
+        from .emails import build_announcement_draft
+        from .utils import send_announcement
+
+        ann = get_object_or_404(Announcement, pk=p.get("announcement"))
+
+        def send(edits, draft=None):
+            count = send_announcement(ann, edits, draft)
+            ann.sent_at = timezone.now()
+            ann.save(update_fields=["sent_at"])
+            return f"Sent '{ann.subject}' to {count} recipient{'s' if count != 1 else ''}."
+        return {"params": {"workflow": workflow, "announcement": ann.id},
+                "default_back": reverse("admin:communications_announcement_change",
+                                        args=[ann.id]),
+                "build": lambda: build_announcement_draft(ann), "send": send}
+
+    if workflow == "invite":
+        from members.models import User
+        from meetings.models import Role
+        from meetings.emails import build_invite_draft, role_phrase
+        from meetings.utils import send_role_invite
+
+        member = get_object_or_404(User, pk=p.get("member"))
+        # Roles arrive either as repeated ``role=1&role=2`` (the activity-report
+        # checkboxes) or comma-joined ``roles=1,2`` (round-tripped through the
+        # review form's single hidden field). De-dupe, preserve order.
+        raw = p.getlist("role") or (p.get("roles") or "").split(",")
+        role_ids = []
+        for x in raw:
+            if x.isdigit() and int(x) not in role_ids:
+                role_ids.append(int(x))
+        if not role_ids:
+            raise Http404("No roles selected")
+        roles = [get_object_or_404(Role, pk=rid, show_on_agenda=True)
+                 for rid in role_ids]
+        phrase = role_phrase(roles)
+
+        def send(edits, draft=None):
+            n = send_role_invite(member, roles, edits, draft=draft)
+            if n:
+                return (f"Invited {member} to take {phrase} "
+                        f"({n} upcoming meeting{'s' if n != 1 else ''} with an open slot).")
+            return (f"Invited {member} to take {phrase} (linked to the sign-up "
+                    f"page; no upcoming meeting currently has these open).")
+        return {"params": {"workflow": workflow, "member": member.id,
+                           "roles": ",".join(str(r.id) for r in roles)},
+                "default_back": reverse(
+                    "admin:members_user_activity_report_detail", args=[member.id]),
+                "build": lambda: build_invite_draft(member, roles), "send": send}
+
+    return None
@@ -33,6 +33,11 @@ else:
     # Railway terminates SSL at its load balancer; trust the forwarded header
     SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
     SECURE_SSL_REDIRECT = True
+    # Railway's deploy health check calls the container over plain HTTP from
+    # its own host name.
+    SECURE_REDIRECT_EXEMPT = [r"^health/ready/$"]
+    if "*" not in ALLOWED_HOSTS:
+        ALLOWED_HOSTS.append("healthcheck.railway.app")
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
 
@@ -58,12 +63,14 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    "core.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_htmx.middleware.HtmxMiddleware",
@@ -74,7 +81,8 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates that reports render time to RequestMetricsMiddleware.
+        "BACKEND": "core.template_backend.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "core" / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -222,6 +230,26 @@ ZOOM_INTEGRATION_ENABLED = (
     os.getenv("ZOOM_INTEGRATION_ENABLED", "false").lower() == "true"
 )
 
+# Review-page sends go to a queue worked by `manage.py run_email_jobs` instead
+# of running inside the officer's request. Off by default (send inline), since
+# nothing is sent unless a worker process is running.
+EMAIL_SEND_ASYNC = os.getenv("EMAIL_SEND_ASYNC", "false").lower() == "true"
+
+# On an anymail backend (Brevo), send each review-page group as batch messages
+# with per-recipient merge_data instead of one API call per recipient. The
+# console/SMTP backends always send one message per recipient.
+EMAIL_BATCH_SEND = os.getenv("EMAIL_BATCH_SEND", "true").lower() == "true"
+
+# Per-request query/timing metrics (core.middleware.RequestMetricsMiddleware).
+# Off by default. When on, every response carries a Server-Timing header and
+# a sample of requests is logged as JSON; requests slower than SLOW_MS are
+# always logged.
+REQUEST_METRICS_ENABLED = (
+    os.getenv("REQUEST_METRICS_ENABLED", "false").lower() == "true"
+)
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv("REQUEST_METRICS_SAMPLE_RATE", "0.1"))
+REQUEST_METRICS_SLOW_MS = float(os.getenv("REQUEST_METRICS_SLOW_MS", "500"))
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -240,5 +268,10 @@ LOGGING = {
             "level": "WARNING",
             "propagate": False,
         },
+        "core.middleware": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
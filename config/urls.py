@@ -1,12 +1,12 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.contrib.auth.views import LoginView
+from django.contrib.auth.views import LoginView, PasswordResetView
 from django.urls import path, include
 
 from core import views as core_views
-from communications.views import email_review
-from members.forms import EmailAuthenticationForm
+from communications.views import email_job_status, email_review
+from members.forms import EmailAuthenticationForm, PasswordResetForm
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -17,10 +17,19 @@ urlpatterns = [
         LoginView.as_view(authentication_form=EmailAuthenticationForm),
         name="login",
     ),
+    path(
+        "accounts/password_reset/",
+        # Also reaches magic-link-only members (unusable password).
+        PasswordResetView.as_view(form_class=PasswordResetForm),
+        name="password_reset",
+    ),
     path("accounts/", include("django.contrib.auth.urls")),
     path("", include("members.urls")),
     path("help/", core_views.help_page, name="help"),
+    path("health/ready/", core_views.readiness, name="readiness"),
+    path("exports/<slug:name>.csv", core_views.export_csv, name="export_csv"),
     path("email/review/", email_review, name="email_review"),
+    path("email/jobs/<int:job_id>/", email_job_status, name="email_job_status"),
     path("", core_views.landing_page, name="landing"),
     path("", include("meetings.urls")),
 ]
@@ -0,0 +1,37 @@
+"""Database helpers shared by migrations.
+
+``trigram_indexes`` builds the forwards/backwards pair for a ``RunPython`` that
+adds pg_trgm GIN indexes for the admin's ``icontains`` searches. Django
+compiles ``icontains`` on PostgreSQL to ``UPPER(col::text) LIKE UPPER(...)``,
+so the indexes are built on exactly that expression. Other databases have no
+pg_trgm and skip them, like the ``TrigramExtension`` operation does.
+"""
+
+
+def _index_name(table, column):
+    return f"{table}_{column}_trgm"
+
+
+def trigram_indexes(table, columns):
+    """``(forwards, backwards)`` functions for ``migrations.RunPython`` that
+    create/drop one GIN trigram index per column of ``table`` on PostgreSQL."""
+
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        quote = schema_editor.quote_name
+        for column in columns:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {quote(_index_name(table, column))} "
+                f"ON {quote(table)} USING gin (UPPER({quote(column)}::text) gin_trgm_ops)"
+            )
+
+    def backwards(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for column in columns:
+            schema_editor.execute(
+                f"DROP INDEX IF EXISTS {schema_editor.quote_name(_index_name(table, column))}"
+            )
+
+    return forwards, backwards
@@ -0,0 +1,29 @@
+"""
+Write one of the streaming CSV exports (core.exports) to a file or stdout.
+
+    python manage.py export_csv members > members.csv
+    python manage.py export_csv attendance --output attendance.csv
+    python manage.py export_csv roles --output roles.csv
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.exports import EXPORTS, stream_csv
+
+
+class Command(BaseCommand):
+    help = "Export members, attendance or role history as CSV, streamed row by row."
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=sorted(EXPORTS))
+        parser.add_argument("--output", help="File to write (default: stdout).")
+
+    def handle(self, *args, **opts):
+        chunks = stream_csv(EXPORTS[opts["name"]]())
+        if not opts["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        with open(opts["output"], "w", newline="", encoding="utf-8") as f:
+            f.writelines(chunks)
+        self.stderr.write(f"Wrote {opts['output']}")
@@ -0,0 +1,139 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.utils.text import slugify
+
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+
+# The current request's timer, set by RequestMetricsMiddleware, so the
+# template backend (core.template_backend) can report render time to it.
+request_timer = ContextVar("request_timer", default=None)
+
+
+class RequestMetricsMiddleware:
+    """Per-request query count, DB time, app time and response size.
+
+    Off unless ``REQUEST_METRICS_ENABLED`` (then it removes itself at
+    startup). When on, every response gets a ``Server-Timing`` header and a
+    sample of requests — ``REQUEST_METRICS_SAMPLE_RATE``, 0..1 — is logged
+    as one JSON line at INFO. Requests slower than ``REQUEST_METRICS_SLOW_MS``
+    are always logged, at WARNING.
+
+    ``template_ms`` is template rendering (through
+    ``core.template_backend``) less the queries it triggered; ``app_ms`` is
+    the rest of the view code. Streaming bodies are produced after the view
+    returns, so their time and size aren't counted.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        self.slow_ms = settings.REQUEST_METRICS_SLOW_MS
+
+    def __call__(self, request):
+        timer = profiling.QueryCollector()
+        token = request_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            request_timer.reset(token)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = timer.seconds * 1000
+        template_ms = timer.render_seconds * 1000
+        app_ms = total_ms - db_ms - template_ms
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={db_ms:.1f};desc="{timer.count} queries"',
+            f"template;dur={template_ms:.1f}",
+            f"app;dur={app_ms:.1f}",
+            f"total;dur={total_ms:.1f}",
+        ])
+
+        slow = total_ms >= self.slow_ms
+        if slow or random.random() < self.sample_rate:
+            match = request.resolver_match
+            record = {
+                "method": request.method,
+                "path": request.path,
+                "view": match.view_name if match else None,
+                "status": response.status_code,
+                "queries": timer.count,
+                "db_ms": round(db_ms, 1),
+                "template_ms": round(template_ms, 1),
+                "app_ms": round(app_ms, 1),
+                "total_ms": round(total_ms, 1),
+                "bytes": None if response.streaming else len(response.content),
+                "slow": slow,
+            }
+            logger.log(logging.WARNING if slow else logging.INFO,
+                       json.dumps(record))
+        return response
+
+
+class ProfilerMiddleware:
+    """Profile one request on demand: add ``?_profile=<format>`` or an
+    ``X-Profile: <format>`` header to any URL. Formats are in
+    ``core.profiling.FORMATS`` (``1`` means speedscope).
+
+    Only honoured under ``DEBUG`` or for superusers; anyone else gets the
+    normal response. Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        fmt = request.GET.get("_profile") or request.headers.get("X-Profile")
+        if not fmt or not (settings.DEBUG or request.user.is_superuser):
+            return self.get_response(request)
+
+        fmt = "speedscope" if fmt == "1" else fmt
+        if fmt not in profiling.FORMATS:
+            return HttpResponseBadRequest(
+                f"Unknown profile format; use one of {', '.join(profiling.FORMATS)}.")
+
+        collector = profiling.QueryCollector(record=True)
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(collector))
+            response, profiler = profiling.profile_call(self._render, request)
+
+        name = f"{request.method} {request.get_full_path()} → {response.status_code}"
+        slug = slugify(request.path) or "root"
+        if fmt == "pstats":
+            out = HttpResponse(profiling.pstats_dump(profiler),
+                               content_type="application/octet-stream")
+            out["Content-Disposition"] = f'attachment; filename="{slug}.prof"'
+            return out
+        report = {"request": name, "sql": collector.report()}
+        if fmt == "sql":
+            return JsonResponse(report, json_dumps_params={"indent": 2})
+        document = profiling.speedscope_document(profiler, name)
+        document["sql"] = report["sql"]
+        out = JsonResponse(document)
+        out["Content-Disposition"] = f'attachment; filename="{slug}.speedscope.json"'
+        return out
+
+    def _render(self, request):
+        # Drain streaming bodies inside the profile so their work counts.
+        response = self.get_response(request)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
@@ -0,0 +1,203 @@
+"""On-demand profiling of a single request (see ProfilerMiddleware).
+
+Runs the view under cProfile with a query collector and turns the result
+into one of:
+
+- ``speedscope`` — a speedscope.app JSON document (drop it on the page for a
+  flame graph), with the SQL report under an extra ``sql`` key;
+- ``pstats`` — the raw cProfile dump, for ``python -m pstats``/snakeviz;
+- ``sql`` — just the SQL report.
+
+The SQL report lists duplicated queries (same SQL and parameters) and
+repeated query shapes (same SQL, different parameters — the usual N+1), each
+with the project line that issued it.
+"""
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import time
+import traceback
+from collections import defaultdict
+
+from django.conf import settings
+
+FORMATS = ("speedscope", "pstats", "sql")
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# Call-tree expansion limits: deep or tiny branches are folded into their
+# parent so the document stays small enough to load.
+MAX_DEPTH = 60
+MIN_FRACTION = 0.001
+
+
+class QueryCollector:
+    """``execute_wrapper`` counting queries and summing their time — the one
+    query timer shared by the profiler, ``RequestMetricsMiddleware`` and the
+    ``benchmark_views`` command.
+
+    With ``record=True`` it also keeps each query's SQL, params, time and the
+    project frame that issued it, for ``report()``. ``time_render`` sums
+    template render time for the request metrics.
+    """
+
+    def __init__(self, record=False):
+        self.record = record
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = []
+        self.render_seconds = 0.0
+        self._rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if self.record:
+                self.queries.append({
+                    "sql": sql,
+                    "params": repr(params),
+                    "ms": elapsed * 1000,
+                    "origin": _project_frame(),
+                })
+
+    def time_render(self, render):
+        """Call ``render()`` and add its time to ``render_seconds``, less the
+        queries it ran (lazy querysets), which are already in ``seconds``. A
+        render nested inside another one counts once."""
+        if self._rendering:
+            return render()
+        self._rendering = True
+        start, db_before = time.perf_counter(), self.seconds
+        try:
+            return render()
+        finally:
+            self._rendering = False
+            self.render_seconds += (
+                time.perf_counter() - start - (self.seconds - db_before))
+
+    def report(self):
+        exact = defaultdict(list)
+        shapes = defaultdict(list)
+        for q in self.queries:
+            exact[(q["sql"], q["params"])].append(q)
+            shapes[q["sql"]].append(q)
+
+        def groups(buckets):
+            rows = [
+                {
+                    "count": len(qs),
+                    "ms": round(sum(q["ms"] for q in qs), 2),
+                    "sql": qs[0]["sql"],
+                    "origins": sorted({q["origin"] for q in qs if q["origin"]}),
+                }
+                for qs in buckets.values() if len(qs) > 1
+            ]
+            return sorted(rows, key=lambda r: (-r["count"], -r["ms"]))
+
+        return {
+            "count": len(self.queries),
+            "ms": round(sum(q["ms"] for q in self.queries), 2),
+            "duplicates": groups(exact),
+            "similar": groups(shapes),
+        }
+
+
+def profile_call(func, *args):
+    """Run ``func(*args)`` under cProfile; return (result, profiler)."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = func(*args)
+    finally:
+        profiler.disable()
+    return result, profiler
+
+
+def pstats_dump(profiler):
+    """The profile in ``pstats`` file format (what ``dump_stats`` writes)."""
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def speedscope_document(profiler, name):
+    """Convert a cProfile run to a speedscope "sampled" profile.
+
+    cProfile only keeps caller→callee totals, so the call tree is rebuilt by
+    splitting each function's time among its callers in proportion — the same
+    approximation flameprof and gprof2dot make. Weights are milliseconds.
+    """
+    stats = pstats.Stats(profiler, stream=io.StringIO()).stats
+    frames, frame_index = [], {}
+    samples, weights = [], []
+
+    def frame(func):
+        if func not in frame_index:
+            filename, line, funcname = func
+            frame_index[func] = len(frames)
+            frames.append({"name": funcname, "file": filename, "line": line})
+        return frame_index[func]
+
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, ct) in callers.items():
+            callees[caller].append((func, ct))
+
+    def walk(func, ms, stack):
+        stack = stack + [frame(func)]
+        total_ct = stats[func][3] * 1000
+        ratio = ms / total_ct if total_ct else 0
+        child_ms = 0.0
+        if len(stack) < MAX_DEPTH:
+            for child, ct in callees.get(func, ()):
+                share = ct * 1000 * ratio
+                if child in stack_funcs or share < total_root_ms * MIN_FRACTION:
+                    continue
+                stack_funcs.add(child)
+                walk(child, share, stack)
+                stack_funcs.discard(child)
+                child_ms += share
+        self_ms = ms - child_ms
+        if self_ms > 0:
+            samples.append(stack)
+            weights.append(round(self_ms, 3))
+
+    roots = [f for f, s in stats.items() if not s[4]]
+    total_root_ms = sum(stats[f][3] for f in roots) * 1000
+    for root in roots:
+        stack_funcs = {root}
+        walk(root, stats[root][3] * 1000, [])
+
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "speakup",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(sum(weights), 3),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+def _project_frame():
+    """``file:line`` of the innermost stack frame in project code."""
+    base = str(settings.BASE_DIR) + os.sep
+    for entry in reversed(traceback.extract_stack()):
+        filename = entry.filename
+        if (filename.startswith(base) and "site-packages" not in filename
+                and not filename.endswith(("core/profiling.py", "core/middleware.py"))):
+            return f"{os.path.relpath(filename, base)}:{entry.lineno}"
+    return ""
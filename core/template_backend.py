@@ -0,0 +1,28 @@
+"""
+Django template backend that reports render time to the request metrics.
+
+Identical to ``DjangoTemplates`` except that each ``render()`` is timed by
+``RequestMetricsMiddleware``'s timer when one is active; otherwise it costs a
+context-variable lookup.
+"""
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from .middleware import request_timer
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timer = request_timer.get()
+        if timer is None:
+            return super().render(context, request)
+        return timer.time_render(
+            lambda: super(TimedTemplate, self).render(context, request))
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
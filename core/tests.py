@@ -1,7 +1,35 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import skipUnless
+from unittest.mock import patch
+from datetime import datetime
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
+from meetings.models import (
+    Attendance,
+    Meeting,
+    MeetingRole,
+    Role,
+    clear_template_in_person_defaults,
+    template_in_person_defaults,
+)
 from members.models import User
+from members.signals import OFFICERS_GROUP_NAME
 
 
 class NavbarKioskLinkTest(TestCase):
@@ -49,3 +77,324 @@ class NavbarKioskLinkTest(TestCase):
         self.client.login(username="root", email="root@example.com", password="testpass")
         response = self._get_landing()
         self.assertContains(response, self.LINK_HREF_FRAGMENT)
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    """Opt-in per-request metrics: Server-Timing header plus JSON log lines."""
+
+    def _get(self, **settings):
+        # Middleware is loaded per Client, so build one under the override.
+        with override_settings(**settings):
+            return Client().get(reverse("role_signups"))
+
+    def test_disabled_by_default(self):
+        response = self._get()
+        self.assertNotIn("Server-Timing", response)
+
+    def test_sampled_request_logged_as_json(self):
+        with self.assertLogs("core.middleware", level="INFO") as logs:
+            response = self._get(
+                REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SAMPLE_RATE=1.0,
+                REQUEST_METRICS_SLOW_MS=60_000)
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("template;dur=", response["Server-Timing"])
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertEqual(logs.records[0].levelname, "INFO")
+        record = json.loads(logs.records[0].getMessage())
+        # Rendering is its own figure; the parts add up to the total.
+        self.assertGreater(record["template_ms"], 0)
+        self.assertAlmostEqual(
+            record["db_ms"] + record["template_ms"] + record["app_ms"],
+            record["total_ms"], delta=0.5)
+        self.assertEqual(record["view"], "role_signups")
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["queries"], 0)
+        self.assertEqual(record["bytes"], len(response.content))
+        self.assertFalse(record["slow"])
+
+    def test_unsampled_request_only_sets_header(self):
+        with self.assertNoLogs("core.middleware"):
+            response = self._get(
+                REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SAMPLE_RATE=0.0,
+                REQUEST_METRICS_SLOW_MS=60_000)
+        self.assertIn("Server-Timing", response)
+
+    def test_template_time_excludes_its_queries(self):
+        from .profiling import QueryCollector
+
+        timer = QueryCollector()
+
+        def render():
+            # A lazy queryset evaluated mid-render: 50 ms in the database.
+            timer(lambda *args: time.sleep(0.05), "SELECT 1", (), False, {})
+            return "page"
+
+        self.assertEqual(timer.time_render(render), "page")
+        self.assertGreaterEqual(timer.seconds, 0.05)
+        self.assertLess(timer.render_seconds, 0.05)
+
+    def test_slow_request_always_logged_as_warning(self):
+        with self.assertLogs("core.middleware", level="WARNING") as logs:
+            self._get(
+                REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SAMPLE_RATE=0.0,
+                REQUEST_METRICS_SLOW_MS=0)
+        self.assertTrue(json.loads(logs.records[0].getMessage())["slow"])
+
+
+@override_settings(DEBUG=False)
+class ProfilerMiddlewareTest(TestCase):
+    """``?_profile=`` / ``X-Profile:`` returns a profile instead of the page,
+    for superusers (or anyone under DEBUG)."""
+
+    def setUp(self):
+        from meetings.models import Meeting, MeetingRole, Role
+        from django.utils import timezone
+
+        self.meeting = Meeting.objects.create(date=timezone.now())
+        role = Role.objects.create(name="Timer")
+        for _ in range(3):
+            MeetingRole.objects.create(meeting=self.meeting, role=role)
+        self.admin = User.objects.create_superuser(
+            username="boss", email="boss@example.com", password="pass")
+
+    def _download_url(self, fmt):
+        url = reverse("meeting_agenda_download", args=[self.meeting.id])
+        return f"{url}?_profile={fmt}"
+
+    def test_ignored_for_non_superusers(self):
+        member = User.objects.create_user(username="m", password="pass")
+        self.client.force_login(member)
+        response = self.client.get(self._download_url("1"), secure=True)
+        self.assertEqual(
+            response["Content-Type"],
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+
+    def test_speedscope_document_with_sql_report(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self._download_url("1"), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(".speedscope.json", response["Content-Disposition"])
+        doc = json.loads(response.content)
+        profile = doc["profiles"][0]
+        self.assertEqual(profile["type"], "sampled")
+        self.assertEqual(len(profile["samples"]), len(profile["weights"]))
+        self.assertTrue(doc["shared"]["frames"])
+        self.assertGreater(doc["sql"]["count"], 0)
+
+    def test_sql_report_on_email_review(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse("email_review"),
+            {"workflow": "reminders", "meeting": self.meeting.id},
+            HTTP_X_PROFILE="sql", secure=True)
+        report = json.loads(response.content)
+        self.assertIn("/email/review/", report["request"])
+        self.assertGreater(report["sql"]["count"], 0)
+
+    def test_collector_groups_duplicates_and_n_plus_one(self):
+        from django.db import connection
+
+        from .profiling import QueryCollector
+
+        collector = QueryCollector(record=True)
+        with connection.execute_wrapper(collector):
+            for _ in range(2):
+                User.objects.filter(pk=self.admin.pk).first()
+            for pk in (1, 2, 3):
+                User.objects.filter(pk=pk).exists()
+        report = collector.report()
+        self.assertEqual(report["count"], 5)
+        self.assertEqual([g["count"] for g in report["duplicates"]], [2])
+        self.assertEqual(sorted(g["count"] for g in report["similar"]), [2, 3])
+        self.assertTrue(report["similar"][0]["origins"][0].startswith("core/tests.py:"))
+
+    def test_pstats_dump_loads(self):
+        import marshal
+
+        self.client.force_login(self.admin)
+        response = self.client.get(self._download_url("pstats"), secure=True)
+        self.assertIn(".prof", response["Content-Disposition"])
+        self.assertIsInstance(marshal.loads(response.content), dict)
+
+    def test_unknown_format_rejected(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self._download_url("flame"), secure=True)
+        self.assertEqual(response.status_code, 400)
+
+
+class CsvExportTest(TestCase):
+    """Streaming CSV exports at /exports/<name>.csv and via export_csv."""
+
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            "off", "off@example.com", "pw", first_name="Olga", is_officer=True)
+        self.member = User.objects.create_user(
+            "mem", "mem@example.com", "pw", first_name="Max")
+        self.meeting = Meeting.objects.create(
+            date=timezone.make_aware(datetime(2025, 3, 4, 19, 0)))
+        Attendance.objects.create(meeting=self.meeting, user=self.member)
+        Attendance.objects.create(
+            meeting=self.meeting, guest_first_name="Gail", guest_email="gail@example.com")
+        role = Role.objects.create(name="Timer")
+        MeetingRole.objects.create(meeting=self.meeting, role=role, user=self.member)
+        MeetingRole.objects.create(meeting=self.meeting, role=role)  # open: skipped
+
+    def _get(self, name, user=None):
+        self.client.force_login(user or self.officer)
+        resp = self.client.get(reverse("export_csv", args=[name]))
+        self.assertTrue(resp.streaming)
+        return resp, list(csv.reader(
+            b"".join(resp.streaming_content).decode().splitlines()))
+
+    def test_members_export_uses_import_columns(self):
+        resp, rows = self._get(
+            "members", User.objects.create_superuser("root", "root@example.com", "pw"))
+        self.assertIn("members-", resp["Content-Disposition"])
+        self.assertEqual(rows[0][:4], ["username", "first_name", "last_name", "email"])
+        self.assertEqual([r[0] for r in rows[1:]], ["mem", "off", "root"])
+
+    def test_attendance_export_joins_member_and_guest(self):
+        self.client.force_login(self.officer)
+        resp = self.client.get(reverse("export_csv", args=["attendance"]))
+        with self.assertNumQueries(1):
+            body = b"".join(resp.streaming_content).decode()
+        rows = list(csv.reader(body.splitlines()))
+        self.assertEqual(rows[1][:7], [
+            "2025-03-04 19:00", "", "mem", "Max", "", "mem@example.com", "False"])
+        self.assertEqual(rows[2][3:7], ["Gail", "", "gail@example.com", "True"])
+
+    def test_role_history_skips_open_slots(self):
+        _, rows = self._get("roles")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][2:5], ["Timer", "", "mem"])
+
+    def test_staff_only_and_unknown_export(self):
+        self.client.force_login(self.member)
+        resp = self.client.get(reverse("export_csv", args=["members"]))
+        self.assertEqual(resp.status_code, 302)
+        self.client.force_login(self.officer)
+        resp = self.client.get(reverse("export_csv", args=["passwords"]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_export_needs_model_view_permission(self):
+        # A superuser can narrow what the Officers group sees.
+        officers = Group.objects.get(name=OFFICERS_GROUP_NAME)
+        officers.permissions.remove(*Permission.objects.filter(
+            codename__in=["view_user", "view_attendance"]))
+        self.client.force_login(self.officer)
+        for name, status in (("members", 403), ("attendance", 403), ("roles", 200)):
+            resp = self.client.get(reverse("export_csv", args=[name]))
+            self.assertEqual(resp.status_code, status, name)
+        self.officer.user_permissions.add(Permission.objects.get(codename="view_attendance"))
+        resp = self.client.get(reverse("export_csv", args=["attendance"]))
+        self.assertEqual(resp.status_code, 200)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command("export_csv", "roles", stdout=out)
+        self.assertTrue(out.getvalue().startswith("meeting_date,meeting_type,role"))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "attendance.csv")
+            call_command("export_csv", "attendance", "--output", path, stderr=StringIO())
+            with open(path, newline="") as f:
+                self.assertEqual(len(list(csv.reader(f))), 3)
+
+
+class IndexedSearchTest(TestCase):
+    """Admin search: whole email addresses are matched through LOWER(email)
+    indexes; everything else is Django's usual contains-search."""
+
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser("root", "root@example.com", "pw"))
+        self.member = User.objects.create_user(
+            "kim", "kim@example.com", first_name="Kim")
+        meeting = Meeting.objects.create(date=timezone.now())
+        Attendance.objects.create(meeting=meeting, user=self.member)
+        Attendance.objects.create(
+            meeting=meeting, guest_first_name="Gail", guest_email="Gail@Example.com")
+
+    def _search(self, url_name, term):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse(url_name), {"q": term})
+        return resp, " ".join(q["sql"] for q in ctx.captured_queries)
+
+    def test_email_term_matches_exactly_ignoring_case(self):
+        resp, sql = self._search("admin:meetings_attendance_changelist", "gail@EXAMPLE.com")
+        self.assertEqual(resp.context["cl"].result_count, 1)
+        self.assertIn("LOWER(", sql)
+        self.assertNotIn(" LIKE ", sql)
+
+    def test_email_search_on_users(self):
+        resp, _ = self._search("admin:members_user_changelist", "KIM@example.com")
+        self.assertEqual([u.pk for u in resp.context["cl"].result_list], [self.member.pk])
+
+    def test_partial_terms_use_contains_search(self):
+        resp, _ = self._search("admin:meetings_attendance_changelist", "example.com")
+        self.assertEqual(resp.context["cl"].result_count, 2)
+
+    @skipUnless(connection.vendor == "postgresql", "pg_trgm indexes are PostgreSQL-only")
+    def test_trigram_indexes_exist(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE indexname LIKE %s", ["%_trgm"])
+            names = {row[0] for row in cursor.fetchall()}
+        self.assertTrue({"members_user_email_trgm",
+                         "meetings_attendance_guest_email_trgm",
+                         "meetings_role_name_trgm"} <= names)
+
+
+class ImportTimeBudgetTest(SimpleTestCase):
+    """Every gunicorn worker and ``manage.py`` run pays for what loads at
+    startup. The heavy document, image and Markdown libraries must load on
+    first use instead. Profile with ``python -X importtime manage.py check``."""
+
+    LAZY_MODULES = {"docx", "lxml", "qrcode", "PIL", "markdown"}
+
+    def test_startup_skips_heavy_libraries(self):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "manage.py", "check"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        imported = {
+            line.rsplit("|", 1)[1].strip()
+            for line in result.stderr.splitlines()
+            if line.startswith("import time:")
+        }
+        self.assertEqual(imported & self.LAZY_MODULES, set())
+        # Sanity check that the profile was actually read.
+        self.assertIn("meetings.views", imported)
+
+
+class ServerProfileTest(TestCase):
+    """The gunicorn profile, its warm-up hook and the deploy health check."""
+
+    def test_readiness_reports_database_state(self):
+        response = self.client.get(reverse("readiness"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+        with patch.object(connection, "ensure_connection",
+                          side_effect=OperationalError("down")):
+            response = self.client.get(reverse("readiness"))
+        self.assertEqual(response.status_code, 503)
+
+    def test_warm_up_primes_caches_and_drops_connections(self):
+        from core.warmup import warm_up
+
+        clear_template_in_person_defaults()
+        # The real close_all() would end the test's transaction.
+        with patch("core.warmup.connections") as connections:
+            warm_up()
+        connections.close_all.assert_called_once_with()
+        with self.assertNumQueries(0):
+            self.assertEqual(template_in_person_defaults(), {})
+
+    def test_gunicorn_profile(self):
+        with patch.dict(os.environ, {"WEB_CONCURRENCY": "3", "PORT": "9000"}):
+            profile = runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+        self.assertEqual(profile["workers"], 3)
+        self.assertEqual(profile["bind"], "0.0.0.0:9000")
+        self.assertTrue(profile["preload_app"])
+        self.assertGreater(profile["max_requests"], 0)
+        self.assertGreaterEqual(profile["_cpu_count"](), 1)
@@ -1,19 +1,20 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.db import DatabaseError, connection
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.utils import timezone
+from django.views.decorators.cache import never_cache
 
 from meetings.models import Meeting
 
+from .exports import EXPORT_PERMISSIONS, EXPORTS, stream_csv
+
 
 def landing_page(request):
     """Public landing page with about info and upcoming meeting dates."""
-    # Keep a meeting listed through the whole day it occurs; drop it the next
-    # day. Comparing the calendar date (not the datetime) avoids hiding a
-    # meeting once its start time has passed earlier that same day.
-    meetings = (
-        Meeting.objects.filter(date__date__gte=timezone.localdate())
-        .order_by("date")[:10]
-    )
+    meetings = Meeting.objects.upcoming().order_by("date")[:10]
     return render(request, "core/landing.html", {"meetings": meetings})
 
 
@@ -21,3 +22,29 @@ def landing_page(request):
 def help_page(request):
     template = "core/help_admin.html" if request.user.is_staff else "core/help_user.html"
     return render(request, template)
+
+
+@staff_member_required
+def export_csv(request, name):
+    """Stream one of ``core.exports.EXPORTS`` as a CSV download, for staff
+    holding that export's view permissions."""
+    if name not in EXPORTS:
+        raise Http404
+    if not request.user.has_perms(EXPORT_PERMISSIONS[name]):
+        raise PermissionDenied
+    response = StreamingHttpResponse(
+        stream_csv(EXPORTS[name]()), content_type="text/csv; charset=utf-8")
+    filename = f"{name}-{timezone.localdate().isoformat()}.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@never_cache
+def readiness(request):
+    """Deploy health check: 200 once this worker is serving and can reach the
+    database, 503 otherwise, so traffic only moves to a ready release."""
+    try:
+        connection.ensure_connection()
+    except DatabaseError:
+        return HttpResponse("database unavailable", status=503, content_type="text/plain")
+    return HttpResponse("ok", content_type="text/plain")
@@ -0,0 +1,64 @@
+"""
+Start-up warm-up for the web server.
+
+``gunicorn.conf.py`` preloads the app and calls ``warm_up()`` in the master
+process before any worker is forked. Every worker, including those recycled by
+``max_requests``, then starts with the views imported, the hot templates
+compiled and the in-process memos filled, instead of paying for them on its
+first requests after a deploy.
+"""
+
+import importlib
+import logging
+
+from django.db import DatabaseError, connections
+from django.template.loader import get_template
+from django.urls import reverse
+
+from meetings.models import template_in_person_defaults
+
+logger = logging.getLogger(__name__)
+
+# Templates behind the public and HTMX views members hit first.
+WARM_TEMPLATES = (
+    "base.html",
+    "core/landing.html",
+    "meetings/agenda.html",
+    "meetings/signups.html",
+    "meetings/partials/role_row.html",
+    "meetings/partials/signup_dialog.html",
+    "meetings/kiosk.html",
+    "meetings/partials/checkin_button.html",
+)
+
+# Loaded on first use (see README-dev "Startup imports"); importing them once
+# in the master shares the pages with every worker.
+WARM_MODULES = ("meetings.agenda_docx", "qrcode", "markdown")
+
+
+def warm_up():
+    """Import views, compile templates and prime caches. Never raises: a cold
+    worker is slower, not broken."""
+    try:
+        # The first reverse() imports every view module through the URLconf
+        # and builds the lookup tables.
+        reverse("landing")
+        for name in WARM_TEMPLATES:
+            get_template(name)
+        for module in WARM_MODULES:
+            importlib.import_module(module)
+        _prime_caches()
+    except Exception:
+        logger.exception("Warm-up failed; workers will start cold")
+    finally:
+        # Forked workers must not share the master's database socket.
+        connections.close_all()
+
+
+def _prime_caches():
+    # Process memory, so forked workers inherit it without a query.
+    try:
+        template_in_person_defaults()
+    except DatabaseError:
+        # First boot before migrate, or the database is briefly away.
+        logger.warning("Warm-up skipped the template attendance defaults")
@@ -0,0 +1,57 @@
+"""
+Gunicorn profile for the web service (``gunicorn -c gunicorn.conf.py
+config.wsgi``, as railway.toml runs it). Sizes can be overridden with
+WEB_CONCURRENCY, GUNICORN_THREADS, GUNICORN_MAX_REQUESTS and
+GUNICORN_TIMEOUT.
+"""
+
+import os
+
+
+def _cpu_count():
+    """CPUs this container may use: the cgroup quota if one is set (the host
+    may have many more cores than the service is allotted), else the
+    scheduler's affinity mask."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as fh:
+            quota, period = fh.read().split()
+        if quota != "max":
+            return max(1, int(quota) // int(period))
+    except (OSError, ValueError):
+        pass
+    return len(os.sched_getaffinity(0))
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Threaded workers: a process per CPU for Python work, with threads to overlap
+# the database and email-API round trips a request waits on.
+workers = int(os.environ.get("WEB_CONCURRENCY", _cpu_count() + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+
+# Load the app once in the master and fork workers from it, so they share its
+# memory and start warm (see when_ready).
+preload_app = True
+
+# Recycle each worker after a while to cap slow memory growth; the jitter
+# keeps workers from all restarting at once.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+# Railway's proxy reuses connections to the app.
+keepalive = 5
+
+# Heartbeat files on tmpfs, so a slow container disk can't stall workers.
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+
+def when_ready(server):
+    """Warm the preloaded app in the master before the first fork."""
+    from core.warmup import warm_up
+
+    warm_up()
+    server.log.info("App warmed up; starting %s workers", server.num_workers)
@@ -1,9 +1,21 @@
 from django import forms
 from django.conf import settings
 from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.db import models
-from django.db.models import Case, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    FilteredRelation,
+    IntegerField,
+    Min,
+    Q,
+    Value,
+    When,
+)
 from django.db.models.functions import Coalesce
+from django.forms.models import BaseInlineFormSet
 from django.http import HttpResponseRedirect
 from django.urls import path, reverse
 from urllib.parse import urlencode
@@ -19,7 +31,12 @@ from .models import (
     Role,
     RoleGuideEmailLog,
     Session,
+    send_first_time_role_email_on_assignment,
 )
+from core.search import IndexedSearchMixin
+from members.models import User
+
+
 def _review_url(workflow, **params):
     """URL of the shared review-before-send page for a workflow + target ids."""
     return reverse("email_review") + "?" + urlencode({"workflow": workflow, **params})
@@ -51,10 +68,11 @@ class RoleAdmin(admin.ModelAdmin):
 
 
 @admin.register(RoleGuideEmailLog)
-class RoleGuideEmailLogAdmin(admin.ModelAdmin):
+class RoleGuideEmailLogAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ("user", "role", "sent_at")
     list_filter = ("role",)
     search_fields = ("user__username", "user__first_name", "user__last_name", "role__name")
+    search_email_fields = ("user__email",)
     readonly_fields = ("sent_at",)
 
 
@@ -107,9 +125,69 @@ class MeetingTypeAdmin(admin.ModelAdmin):
         )
 
 
-class MeetingSessionInline(admin.TabularInline):
+class SharedChoicesMixin:
+    """Build the listed foreign-key selects once per request and share the
+    choice list across every form in the inline. Django otherwise re-runs the
+    choice query for each row it renders, which adds up on a meeting with 30
+    role rows. Validation still goes through the field's queryset."""
+
+    shared_choice_fields = ()
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if formfield is not None and db_field.name in self.shared_choice_fields:
+            shared = request.__dict__.setdefault("_shared_inline_choices", {})
+            key = (self.model, db_field.name)
+            if key not in shared:
+                shared[key] = list(formfield.choices)
+            formfield.choices = shared[key]
+        return formfield
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Autocomplete widget that renders its selected option from ``labels``
+    (``{str(pk): label}``, loaded once for the whole page) instead of looking
+    the selected object up again for every row. Values missing from
+    ``labels`` (e.g. a user picked on a re-displayed invalid POST) fall back
+    to the stock per-row lookup."""
+
+    def __init__(self, field, admin_site, labels, **kwargs):
+        super().__init__(field, admin_site, **kwargs)
+        self.labels = labels
+
+    def optgroups(self, name, value, attr=None):
+        selected = [
+            str(v) for v in value if str(v) not in self.choices.field.empty_values
+        ]
+        if any(v not in self.labels for v in selected):
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required and not self.allow_multiple_selected:
+            options.append(self.create_option(name, "", "", False, 0))
+        for v in selected:
+            options.append(
+                self.create_option(name, v, self.labels[v], True, len(options))
+            )
+        return [(None, options, 0)]
+
+
+class ChangedRowsFormSet(BaseInlineFormSet):
+    """Inline formset that validates only the existing rows an officer
+    touched. Django cleans every row on save (a lookup per select, plus the
+    model's foreign-key checks), though unchanged rows are never written."""
+
+    def _construct_form(self, i, **kwargs):
+        # full_clean() returns early for an unchanged empty_permitted form.
+        if self.is_bound and i < self.initial_form_count():
+            kwargs["empty_permitted"] = True
+        return super()._construct_form(i, **kwargs)
+
+
+class MeetingSessionInline(SharedChoicesMixin, admin.TabularInline):
     model = MeetingSession
+    formset = ChangedRowsFormSet
     extra = 0
+    shared_choice_fields = ("session",)
     # Sessions are copied from the MeetingType template at creation and
     # almost never change per-meeting. Collapse the whole inline so it
     # doesn't take page space until an officer explicitly needs to edit
@@ -119,12 +197,62 @@ class MeetingSessionInline(admin.TabularInline):
         models.TextField: {"widget": forms.Textarea(attrs={"rows": 2, "cols": 30})},
     }
 
+    def get_queryset(self, request):
+        # Each row's label is MeetingSession.__str__ (meeting + session).
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("meeting__meeting_type", "session")
+        )
 
-class MeetingRoleInline(admin.StackedInline):
+
+class MeetingRoleFormSet(ChangedRowsFormSet):
+    """Role inline formset that writes the changed rows in one
+    ``bulk_update`` rather than a ``save()`` each: dragging rows rewrites
+    every row's sort_order, and a meeting has ~30 rows. ``bulk_update``
+    skips ``post_save``, so the first-time role email is run here, and only
+    for rows whose assignee changed; new rows are still saved (and
+    signalled) individually."""
+
+    def save_existing_objects(self, commit=True):
+        if not commit:
+            return super().save_existing_objects(commit)
+        self.changed_objects = []
+        self.deleted_objects = []
+        columns = {
+            f.name for f in self.model._meta.concrete_fields if not f.primary_key
+        }
+        saved, fields, reassigned = [], set(), []
+        for form in self.initial_forms:
+            obj = form.instance
+            if obj.pk is None:
+                continue
+            if form in self.deleted_forms:
+                self.deleted_objects.append(obj)
+                self.delete_existing(obj, commit=commit)
+            elif form.has_changed():
+                self.changed_objects.append((obj, form.changed_data))
+                saved.append(self.save_existing(form, obj, commit=False))
+                form.save_m2m()
+                fields.update(f for f in form.changed_data if f in columns)
+                if "user" in form.changed_data:
+                    reassigned.append(obj)
+        if fields:
+            self.model.objects.bulk_update(saved, sorted(fields))
+        for obj in reassigned:
+            send_first_time_role_email_on_assignment(
+                sender=self.model, instance=obj, created=False
+            )
+        return saved
+
+
+class MeetingRoleInline(SharedChoicesMixin, admin.StackedInline):
     model = MeetingRole
+    formset = MeetingRoleFormSet
     fk_name = "meeting"
     extra = 0
     autocomplete_fields = ["user"]
+    shared_choice_fields = ("role", "session", "evaluates")
     # Custom inline template inserts a section header before each new
     # session group (see meetings/templates/admin/edit_inline/
     # meetings_meetingrole_stacked.html).
@@ -187,44 +315,85 @@ class MeetingRoleInline(admin.StackedInline):
     def get_queryset(self, request):
         # Order rows so they cluster under their session header on the
         # change form. Per-meeting session order lives on MeetingSession;
-        # MeetingRole.session points at the reusable Session, so subquery
-        # for the matching MeetingSession.sort_order. Null/missing
-        # sessions sort first (templates can put them under a "no
-        # session" header).
+        # MeetingRole.session points at the reusable Session, so join the
+        # MeetingSession for this row's (meeting, session) and take its
+        # sort_order. Min() collapses the join if a session appears twice in
+        # a meeting. Null/missing sessions sort first (templates can put
+        # them under a "no session" header). The row headers render role,
+        # user, session and pairing, so select those too.
         return (
             super()
             .get_queryset(request)
+            .select_related("role", "user", "session", "evaluates__user")
             .annotate(
-                _session_order=Subquery(
-                    MeetingSession.objects.filter(
-                        meeting=OuterRef("meeting"),
-                        session=OuterRef("session"),
-                    ).values("sort_order")[:1]
-                )
+                _meeting_session=FilteredRelation(
+                    "session__meetingsession",
+                    condition=Q(session__meetingsession__meeting=F("meeting")),
+                ),
+                _session_order=Min("_meeting_session__sort_order"),
             )
-            .order_by("_session_order", "sort_order", "id")
+            .order_by(F("_session_order").asc(nulls_first=True), "sort_order", "id")
         )
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        parent_id = request.resolver_match.kwargs.get("object_id")
         if db_field.name == "evaluates":
             # Limit the picker to MeetingRoles on the parent meeting whose
             # role is flagged as evaluated (Speaker, Ranter, …). The parent
             # meeting's PK is in the admin URL.
-            parent_id = request.resolver_match.kwargs.get("object_id")
             if parent_id:
                 kwargs["queryset"] = (
                     MeetingRole.objects
                     .filter(meeting_id=parent_id, role__is_evaluated_role=True)
-                    .select_related("role", "user")
+                    .select_related("meeting__meeting_type", "role", "user")
                 )
             else:
                 kwargs["queryset"] = MeetingRole.objects.none()
+        elif db_field.name == "user" and parent_id:
+            # Everyone already assigned on this meeting, labelled once for
+            # all rows' autocomplete widgets.
+            kwargs["widget"] = PreloadedAutocompleteSelect(
+                db_field,
+                self.admin_site,
+                labels={
+                    str(u.pk): str(u)
+                    for u in User.objects.filter(
+                        meeting_roles__meeting_id=parent_id
+                    ).distinct()
+                },
+                using=kwargs.get("using"),
+            )
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
+class StaffingListFilter(admin.SimpleListFilter):
+    """Filter meetings by whether every role slot is filled. Reads the
+    ``_roles_filled`` / ``_roles_total`` annotations from
+    ``MeetingAdmin.get_queryset``."""
+
+    title = "staffing"
+    parameter_name = "staffing"
+
+    def lookups(self, request, model_admin):
+        return [
+            ("understaffed", "Understaffed"),
+            ("staffed", "Fully staffed"),
+        ]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == "understaffed":
+            return queryset.filter(_roles_filled__lt=F("_roles_total"))
+        if value == "staffed":
+            return queryset.filter(_roles_filled=F("_roles_total"))
+        return queryset
+
+
 @admin.register(Meeting)
 class MeetingAdmin(admin.ModelAdmin):
     list_display = ("date", "meeting_type", "theme", "role_count_status")
+    list_filter = (StaffingListFilter,)
+    list_select_related = ("meeting_type",)
     inlines = [MeetingSessionInline, MeetingRoleInline]
     change_form_template = "meetings/admin/meeting_change_form.html"
     # Word of the day is the only field that changes regularly after a
@@ -273,12 +442,17 @@ class MeetingAdmin(admin.ModelAdmin):
             ]
         return fieldsets
 
-    def role_count_status(self, obj):
-        filled = obj.roles.filter(user__isnull=False).count()
-        total = obj.roles.count()
-        return f"{filled}/{total} Roles Filled"
+    def get_queryset(self, request):
+        # Filled/total slot counts for the Staffing column and filter, computed
+        # in the changelist query instead of two COUNTs per row.
+        return super().get_queryset(request).annotate(
+            _roles_filled=Count("roles", filter=Q(roles__user__isnull=False)),
+            _roles_total=Count("roles"),
+        )
 
-    role_count_status.short_description = "Staffing"
+    @admin.display(description="Staffing", ordering="_roles_filled")
+    def role_count_status(self, obj):
+        return f"{obj._roles_filled}/{obj._roles_total} Roles Filled"
 
     def get_urls(self):
         urls = super().get_urls()
@@ -406,11 +580,50 @@ class MeetingRoleAdmin(admin.ModelAdmin):
         "role__is_evaluated_role",
     )
     list_editable = ("user", "sort_order")
+    # The meeting, role, user and evaluates columns all render __str__ chains
+    # (evaluates -> its meeting's type, role and user).
+    list_select_related = (
+        "meeting__meeting_type",
+        "role",
+        "user",
+        "evaluates__meeting__meeting_type",
+        "evaluates__role",
+        "evaluates__user",
+    )
+    # A plain select in the editable user column would list every member on
+    # every row; the autocomplete widget renders only the current assignee
+    # and fetches matches a page at a time from the admin autocomplete view.
+    autocomplete_fields = ("user",)
     # The evaluates picker would list every MeetingRole otherwise; raw_id_fields
     # gives a popup search instead. Editing in the Meeting-scoped inline is
     # the primary workflow; this is just to keep the standalone admin sane.
     raw_id_fields = ("evaluates",)
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "user":
+            # Labels are filled per row by get_changelist_form.
+            kwargs["widget"] = PreloadedAutocompleteSelect(
+                db_field, self.admin_site, labels={}, using=kwargs.get("using")
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        base = super().get_changelist_form(request, **kwargs)
+
+        class ChangelistForm(base):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                # The row's user came in with list_select_related, so label
+                # the widget from it rather than looking it up again.
+                user = self.instance.user if self.instance.user_id else None
+                if user is not None and "user" in self.fields:
+                    # Unwrap the admin's RelatedFieldWidgetWrapper.
+                    widget = self.fields["user"].widget
+                    widget = getattr(widget, "widget", widget)
+                    widget.labels = {str(user.pk): str(user)}
+
+        return ChangelistForm
+
 
 class MeetingListFilter(admin.RelatedFieldListFilter):
     """List only meetings that have attendance records, newest-first. The
@@ -453,7 +666,7 @@ class AttendeeTypeListFilter(admin.SimpleListFilter):
 
 
 @admin.register(Attendance)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         "meeting",
         "who_attended",
@@ -472,6 +685,7 @@ class AttendanceAdmin(admin.ModelAdmin):
         "user__last_name",
         "user__email",
     )
+    search_email_fields = ("guest_email", "user__email")
     date_hierarchy = "meeting__date"
     ordering = ("-meeting__date",)
     actions = ["convert_guest_to_user"]
@@ -492,22 +706,22 @@ class AttendanceAdmin(admin.ModelAdmin):
 
     @admin.action(description="Convert selected guests to Users")
     def convert_guest_to_user(self, request, queryset):
-        from .services import convert_guest_attendance_to_user
-
-        created_count = 0
-        linked_count = 0
-
-        for attendance in queryset:
-            user, created = convert_guest_attendance_to_user(attendance)
-            if user and created:
-                created_count += 1
-            elif user:
-                linked_count += 1
+        from .services import convert_guest_attendances
 
+        result = convert_guest_attendances(queryset.filter(user__isnull=True))
+        message = (
+            f"Created {len(result.created)} new users and linked "
+            f"{result.linked} attendance(s) to existing users."
+        )
+        if result.skipped:
+            message += (
+                f" Skipped {result.skipped} already recorded for that member "
+                f"at that meeting."
+            )
         self.message_user(
             request,
-            f"Created {created_count} new users and linked {linked_count} existing users. "
-            f"New users will need to reset their password via the login page.",
+            message + " New users can sign in with an email link or reset "
+            "their password via the login page.",
             messages.SUCCESS,
         )
 
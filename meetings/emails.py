@@ -13,7 +13,7 @@ Bodies are authored in Markdown (rendered to HTML at send time).
 from django.conf import settings
 from django.urls import reverse
 
-from members.models import User
+from communications.recipients import members_without_role, recipients
 
 # --- reminder templates ----------------------------------------------------
 
@@ -96,19 +96,14 @@ def build_reminder_draft(meeting, back_url=""):
             "recipients": assignees,
         })
 
-    open_roles = meeting.roles.filter(user__isnull=True).select_related("role")
-    if open_roles.exists():
-        assigned_ids = assignments.values_list("user_id", flat=True)
+    open_roles = list(meeting.roles.filter(user__isnull=True).select_related("role"))
+    if open_roles:
         role_list = "\n".join(f"- {r.role.name}" for r in open_roles)
-        nudges = [
-            {"email": m.email, "name": str(m), "context": {
-                "first_name": m.first_name, "date": meeting.date.date(),
-                "long_date": long_date, "role_list": role_list,
-                "signups_url": signups_url, "agenda_url": agenda_url,
-            }}
-            for m in User.objects.filter(is_active=True, is_guest=False)
-            .exclude(id__in=assigned_ids) if m.email
-        ]
+        nudges = recipients(members_without_role(meeting), {
+            "date": meeting.date.date(), "long_date": long_date,
+            "role_list": role_list, "signups_url": signups_url,
+            "agenda_url": agenda_url,
+        })
         if nudges:
             groups.append({
                 "key": "open_roles",
@@ -250,17 +245,14 @@ def build_invite_draft(member, roles, back_url="", now=None):
     fan out. For each role we list the upcoming meetings that currently have it
     open. ``open_count`` (distinct upcoming meetings with at least one of these
     roles open) drives the status message."""
-    from .utils import upcoming_meetings_with_open_role
+    from .utils import upcoming_open_slots_by_role
 
     domain = settings.SITE_URL
     signups_url = f"{domain}{reverse('role_signups')}"
 
-    open_meeting_ids = set()
-    per_role = []
-    for role in roles:
-        meetings = list(upcoming_meetings_with_open_role(role, now=now))
-        open_meeting_ids.update(m.id for m in meetings)
-        per_role.append((role, meetings))
+    open_by_role = upcoming_open_slots_by_role(roles, now=now)
+    per_role = [(role, open_by_role.get(role.id, [])) for role in roles]
+    open_meeting_ids = {m.id for meetings in open_by_role.values() for m in meetings}
 
     def _when(meetings, indent="  "):
         return "\n".join(
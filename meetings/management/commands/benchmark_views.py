@@ -0,0 +1,402 @@
+"""
+Benchmark the hot public, member, HTMX and officer views.
+
+Seeds a realistic club — by default 2 years of biweekly meetings built from a
+regular-meeting template, 150 members and 3,000 attendance rows — then
+requests each view through the Django test client and records, per view, the
+query count, total DB time, wall time and response size. Prints (or writes
+with --output) a JSON report; pass --compare with an earlier report to see the
+deltas between two commits.
+
+Nothing is kept. By default the run happens in a throwaway test database
+(created and migrated like ``manage.py test`` does) so results don't depend on
+local data; --in-place seeds into the configured database instead. Either way
+the seed and every write the views make are rolled back at the end.
+
+    python manage.py benchmark_views --output bench.json
+    python manage.py benchmark_views --compare bench.json
+"""
+
+import datetime as dt
+import json
+import random
+import statistics
+import subprocess
+import time
+from urllib.parse import urlencode
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from communications.models import Announcement
+from core.profiling import QueryCollector
+from members.models import User
+from meetings.models import (
+    Attendance,
+    Meeting,
+    MeetingRole,
+    MeetingType,
+    MeetingTypeItem,
+    MeetingTypeSession,
+    Role,
+    Session,
+    clear_template_in_person_defaults,
+    send_first_time_role_email_on_assignment,
+)
+
+MEETING_TIME = dt.time(18, 45)
+
+# (session name, duration, takes_roles) in agenda order.
+SESSIONS = [
+    ("Opening", 10, True),
+    ("Table Topics", 20, True),
+    ("Break", 10, False),
+    ("Prepared Speeches", 30, True),
+    ("Evaluations", 20, True),
+]
+
+# (role name, session name, count, flags) — a typical regular meeting.
+TEMPLATE = [
+    ("Toastmaster", "Opening", 1, {}),
+    ("General Evaluator", "Opening", 1, {"single_holder_all_slots": True}),
+    ("Timer", "Opening", 1, {}),
+    ("Ah-Counter", "Opening", 1, {}),
+    ("Grammarian", "Opening", 1, {}),
+    ("Table Topics Master", "Table Topics", 1, {}),
+    ("Table Topics Evaluator", "Table Topics", 1, {"is_evaluator_role": True}),
+    ("Speaker", "Prepared Speeches", 3,
+     {"is_evaluated_role": True, "shows_pathways_fields": True,
+      "min_minutes": 5, "max_minutes": 7}),
+    ("Evaluator", "Evaluations", 3, {"is_evaluator_role": True}),
+    ("General Evaluator", "Evaluations", 1, {"single_holder_all_slots": True}),
+    ("President", "Opening", 1, {"show_on_agenda": False}),
+]
+
+
+class _Rollback(Exception):
+    """Raised to discard the seed and everything the views wrote."""
+
+
+class Command(BaseCommand):
+    help = "Measure query count, DB time and wall time of the hot views (JSON report)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--members", type=int, default=150,
+                            help="Active members to seed (default 150).")
+        parser.add_argument("--years", type=int, default=2,
+                            help="Years of past biweekly meetings (default 2).")
+        parser.add_argument("--upcoming", type=int, default=6,
+                            help="Upcoming meetings to seed (default 6).")
+        parser.add_argument("--attendance", type=int, default=3000,
+                            help="Attendance rows across past meetings (default 3000).")
+        parser.add_argument("--iterations", type=int, default=5,
+                            help="Timed requests per view, after one warm-up (default 5).")
+        parser.add_argument("--seed", type=int, default=1,
+                            help="Random seed, so runs are comparable (default 1).")
+        parser.add_argument("--in-place", action="store_true",
+                            help="Seed into the configured database instead of a "
+                                 "throwaway test database (still rolled back).")
+        parser.add_argument("--output", metavar="FILE",
+                            help="Write the JSON report here instead of stdout.")
+        parser.add_argument("--compare", metavar="FILE",
+                            help="Earlier JSON report to print deltas against.")
+
+    def handle(self, *args, **opts):
+        if opts["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        baseline = None
+        if opts["compare"]:
+            with open(opts["compare"]) as fh:
+                baseline = json.load(fh)
+
+        old_name = None
+        if not opts["in_place"]:
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False)
+        report = {}
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=["testserver"],
+                EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+            ):
+                try:
+                    with transaction.atomic():
+                        report = self._run(opts)
+                        raise _Rollback
+                except _Rollback:
+                    pass
+        finally:
+            # The template memo may hold rows that were just rolled back.
+            clear_template_in_person_defaults()
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        text = json.dumps(report, indent=2)
+        if opts["output"]:
+            with open(opts["output"], "w") as fh:
+                fh.write(text + "\n")
+            self.stderr.write(f"Wrote {opts['output']}")
+        else:
+            self.stdout.write(text)
+        if baseline:
+            self._print_comparison(baseline, report)
+
+    # -- seeding -----------------------------------------------------------
+
+    def _run(self, opts):
+        rng = random.Random(opts["seed"])
+        # Historical assignments shouldn't queue onboarding emails.
+        post_save.disconnect(send_first_time_role_email_on_assignment,
+                             sender=MeetingRole)
+        try:
+            fixture = self._seed(rng, opts)
+        finally:
+            post_save.connect(send_first_time_role_email_on_assignment,
+                              sender=MeetingRole)
+        return {
+            "generated_at": timezone.now().isoformat(),
+            "git_commit": _git_commit(),
+            "database": connection.vendor,
+            "iterations": opts["iterations"],
+            "seed": {
+                "members": User.objects.filter(is_guest=False).count(),
+                "meetings": Meeting.objects.count(),
+                "meeting_roles": MeetingRole.objects.count(),
+                "attendance": Attendance.objects.count(),
+            },
+            "views": self._measure_all(fixture, opts["iterations"]),
+        }
+
+    def _seed(self, rng, opts):
+        sessions = {
+            name: Session.objects.create(
+                name=name, duration_minutes=minutes, takes_roles=takes_roles)
+            for name, minutes, takes_roles in SESSIONS
+        }
+        roles = {}
+        for name, _, _, flags in TEMPLATE:
+            if name not in roles:
+                roles[name] = Role.objects.create(name=name, **flags)
+        mtype = MeetingType.objects.create(name="Regular Meeting")
+        for order, (name, _, _) in enumerate(SESSIONS):
+            MeetingTypeSession.objects.create(
+                meeting_type=mtype, session=sessions[name], order=order)
+        for order, (name, session, count, _) in enumerate(TEMPLATE):
+            MeetingTypeItem.objects.create(
+                meeting_type=mtype, role=roles[name], session=sessions[session],
+                count=count, in_person=rng.random() < 0.7, order=order)
+
+        today = timezone.localdate()
+        unusable = make_password(None)
+        members = User.objects.bulk_create([
+            User(
+                username=f"bench{i}", email=f"bench{i}@example.com",
+                first_name=f"Member{i}", last_name=f"Bench{i}",
+                password=unusable, is_guest=(i % 15 == 0),
+                join_date=today - dt.timedelta(days=rng.randint(0, 900)),
+            )
+            for i in range(opts["members"])
+        ])
+        officer = User.objects.create_user(
+            username="bench-officer", email="bench-officer@example.com",
+            first_name="Olive", last_name="Officer",
+            is_officer=True, is_staff=True, is_superuser=True)
+        regulars = [m for m in members if not m.is_guest] or [officer]
+
+        past_count = 26 * opts["years"]
+        past, upcoming = [], []
+        for n in range(-past_count, opts["upcoming"]):
+            day = today + dt.timedelta(days=14 * n)
+            meeting = Meeting.objects.create(
+                meeting_type=mtype,
+                date=timezone.make_aware(dt.datetime.combine(day, MEETING_TIME)),
+                theme=f"Theme {n}", word_of_the_day=f"word{n}")
+            (past if n < 0 else upcoming).append(meeting)
+
+        # Fill slots: past meetings nearly full, upcoming about half full.
+        slots = []
+        for meeting in past + upcoming:
+            fill = 0.9 if meeting in past else 0.5
+            rows = list(meeting.roles.select_related("role").order_by("sort_order", "id"))
+            holders = rng.sample(regulars, min(len(rows), len(regulars)))
+            speakers = []
+            for row, holder in zip(rows, holders):
+                if rng.random() < fill:
+                    row.user = holder
+                    row.in_person = rng.random() < 0.7
+                    if row.role.shows_pathways_fields:
+                        row.pathways_path = rng.choice(MeetingRole.PATHWAYS_PATHS)[0]
+                        row.pathways_level = rng.randint(1, 5)
+                        row.notes = f"Speech by {holder.first_name}"
+                if row.role.is_evaluated_role:
+                    speakers.append(row)
+                elif row.role.name == "Evaluator" and speakers:
+                    row.evaluates = speakers.pop(0)
+                slots.append(row)
+        MeetingRole.objects.bulk_update(
+            slots, ["user", "in_person", "notes", "pathways_path",
+                    "pathways_level", "evaluates"])
+
+        # Spread the attendance rows over past meetings, a few as walk-ins.
+        attendance = []
+        per_meeting, extra = divmod(opts["attendance"], max(len(past), 1))
+        for i, meeting in enumerate(past):
+            k = per_meeting + (1 if i < extra else 0)
+            walk_ins = k // 20
+            for member in rng.sample(members, min(k - walk_ins, len(members))):
+                attendance.append(Attendance(meeting=meeting, user=member))
+            for g in range(walk_ins):
+                attendance.append(Attendance(
+                    meeting=meeting, guest_first_name=f"Guest{g}",
+                    guest_last_name="Walkin", guest_email=f"walkin{i}.{g}@example.com"))
+        Attendance.objects.bulk_create(attendance, batch_size=500)
+
+        next_meeting = upcoming[0] if upcoming else past[-1]
+        open_slot = (
+            next_meeting.roles.filter(user__isnull=True,
+                                      role__single_holder_all_slots=False)
+            .first()
+        )
+        if open_slot is None:
+            open_slot = next_meeting.roles.filter(
+                role__single_holder_all_slots=False).first()
+            open_slot.user = None
+            open_slot.save()
+        claimer = next(
+            m for m in regulars
+            if not next_meeting.roles.filter(user=m).exists()
+        )
+        busiest = max(regulars, key=lambda m: m.meeting_roles.count())
+        announcement = Announcement.objects.create(
+            subject="Club news", body="Hi {first_name}, see you soon!")
+        return {
+            "next_meeting": next_meeting,
+            "last_meeting": past[-1] if past else next_meeting,
+            "open_slot": open_slot,
+            "claimer": claimer,
+            "busiest": busiest,
+            "officer": officer,
+            "announcement": announcement,
+        }
+
+    # -- measuring ---------------------------------------------------------
+
+    def _measure_all(self, f, iterations):
+        anon = Client()
+        member = Client()
+        member.force_login(f["claimer"])
+        officer = Client()
+        officer.force_login(f["officer"])
+        next_id = f["next_meeting"].id
+        slot_id = f["open_slot"].id
+
+        def review(**params):
+            return reverse("email_review") + "?" + urlencode(params)
+
+        scenarios = [
+            ("role_signups", anon, "get", reverse("role_signups"), None),
+            ("role_signups_member", member, "get", reverse("role_signups"), None),
+            ("meeting_agenda", anon, "get",
+             reverse("meeting_agenda", args=[next_id]), None),
+            ("meeting_agenda_download", anon, "get",
+             reverse("meeting_agenda_download", args=[next_id]), None),
+            ("checkin_kiosk", anon, "get", reverse("checkin_kiosk"), None),
+            ("signup_role_form", member, "get",
+             reverse("signup_role_form", args=[slot_id]), None),
+            # Each claim is followed by a drop of the same slot, so both
+            # stay measurable across iterations.
+            ("toggle_role_claim", member, "post",
+             reverse("toggle_role", args=[slot_id]),
+             {"in_person": "true", "notes": "Benchmark"}),
+            ("toggle_role_drop", member, "post",
+             reverse("toggle_role", args=[slot_id]), None),
+            ("my_activity", member, "get", reverse("my_activity"), None),
+            ("activity_report", officer, "get",
+             reverse("admin:members_user_activity_report"), None),
+            ("activity_report_detail", officer, "get",
+             reverse("admin:members_user_activity_report_detail",
+                     args=[f["busiest"].id]), None),
+            ("email_review_reminders", officer, "get",
+             review(workflow="reminders", meeting=next_id), None),
+            ("email_review_feedback", officer, "get",
+             review(workflow="feedback", meeting=f["last_meeting"].id), None),
+            ("email_review_announcement", officer, "get",
+             review(workflow="announcement", announcement=f["announcement"].id),
+             None),
+        ]
+        samples = {name: [] for name, *_ in scenarios}
+        # Round-robin so claim/drop alternate; round 0 is the warm-up.
+        for round_ in range(iterations + 1):
+            for name, client, method, url, data in scenarios:
+                result = _measure(client, method, url, data)
+                if round_:
+                    samples[name].append(result)
+        return {name: _summarize(runs) for name, runs in samples.items()}
+
+    def _print_comparison(self, old, new):
+        w = self.stderr.write
+        w("")
+        w(f"{'view':28} {'queries':>15} {'db ms':>17} {'wall ms':>19}")
+        for name, cur in new["views"].items():
+            prev = old.get("views", {}).get(name)
+            if prev is None:
+                w(f"{name:28} {'(new)':>15}")
+                continue
+            w(f"{name:28} "
+              f"{prev['queries']:>6} → {cur['queries']:<6} "
+              f"{prev['db_ms']:>7.1f} → {cur['db_ms']:<7.1f} "
+              f"{prev['wall_ms']:>7.1f} → {cur['wall_ms']:<7.1f}"
+              f"{_pct(prev['wall_ms'], cur['wall_ms'])}")
+
+
+def _measure(client, method, url, data):
+    """One request: status, queries, DB/wall time and body size. Streaming
+    bodies are consumed inside the timed window."""
+    timer = QueryCollector()
+    with connection.execute_wrapper(timer):
+        start = time.perf_counter()
+        response = getattr(client, method)(url, data or {}, secure=True)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        wall = time.perf_counter() - start
+    return {
+        "status": response.status_code,
+        "queries": timer.count,
+        "db_ms": timer.seconds * 1000,
+        "wall_ms": wall * 1000,
+        "bytes": size,
+    }
+
+
+def _summarize(runs):
+    return {
+        "status": runs[-1]["status"],
+        "queries": max(r["queries"] for r in runs),
+        "db_ms": round(statistics.median(r["db_ms"] for r in runs), 2),
+        "wall_ms": round(statistics.median(r["wall_ms"] for r in runs), 2),
+        "wall_ms_min": round(min(r["wall_ms"] for r in runs), 2),
+        "bytes": runs[-1]["bytes"],
+    }
+
+
+def _pct(old, new):
+    if not old:
+        return ""
+    return f" ({(new - old) / old:+.0%})"
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
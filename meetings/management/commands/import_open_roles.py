@@ -210,7 +210,7 @@ class Command(BaseCommand):
         except ValueError:
             self.stderr.write(f"--inspect: bad date {date_str!r}")
             return
-        qs = Meeting.objects.filter(date__date=d)
+        qs = Meeting.objects.on_day(d)
         w("")
         w(f"--- inspect {date_str} ({qs.count()} meeting(s)) ---")
         for meeting in qs:
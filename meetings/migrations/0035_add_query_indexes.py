@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-19 08:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("meetings", "0034_add_co_timer_role"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="meeting",
+            index=models.Index(fields=["date"], name="meeting_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="meetingrole",
+            index=models.Index(
+                fields=["meeting", "user"], name="meetingrole_meeting_user_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="meetingrole",
+            index=models.Index(
+                condition=models.Q(("user__isnull", True)),
+                fields=["meeting", "role"],
+                name="meetingrole_open_slot_idx",
+            ),
+        ),
+    ]
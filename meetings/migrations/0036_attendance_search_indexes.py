@@ -0,0 +1,34 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:45
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+from core.db import trigram_indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("meetings", "0035_add_query_indexes"),
+        ("members", "0007_email_search_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                django.db.models.functions.text.Lower("guest_email"),
+                name="attendance_guest_email_lower",
+            ),
+        ),
+        # PostgreSQL only (pg_trgm is enabled by members 0007); no-ops on SQLite.
+        migrations.RunPython(
+            *trigram_indexes(
+                "meetings_attendance",
+                ["guest_first_name", "guest_last_name", "guest_email"],
+            )
+        ),
+        migrations.RunPython(*trigram_indexes("meetings_role", ["name"])),
+    ]
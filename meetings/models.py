@@ -1,10 +1,14 @@
+import datetime as dt
 import logging
+import time
 
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models.signals import post_save
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -138,6 +142,72 @@ class MeetingTypeItem(models.Model):
         return f"{self.meeting_type}: {self.role} x{self.count}"
 
 
+# The (meeting_type_id, role_id) -> in_person table built by
+# template_in_person_defaults(), kept in process memory with the time it
+# expires: the sign-up dialog and every claim read it, so even a shared cache
+# would cost a round trip each time. Saving or deleting a MeetingTypeItem
+# clears it in the process that made the change; other gunicorn workers
+# reload it within TEMPLATE_IN_PERSON_TTL seconds.
+TEMPLATE_IN_PERSON_TTL = 60
+_template_in_person = (None, 0.0)
+
+
+def template_in_person_defaults():
+    """Every template's expected attendance mode, as a dict keyed by
+    ``(meeting_type_id, role_id)``.
+
+    Loaded with one query and memoized per process, so the sign-up dialog,
+    claims and bulk renderers can look up a default without touching
+    MeetingTypeItem. When a template lists the same role more than once, the
+    first item in agenda order wins (matching the old per-row ``.first()``
+    lookup).
+    """
+    global _template_in_person
+    defaults, expires_at = _template_in_person
+    if defaults is None or time.monotonic() >= expires_at:
+        defaults = {}
+        for meeting_type_id, role_id, in_person in (
+            MeetingTypeItem.objects.order_by("order", "id")
+            .values_list("meeting_type_id", "role_id", "in_person")
+        ):
+            defaults.setdefault((meeting_type_id, role_id), in_person)
+        # One assignment, so threads never see a half-built pair.
+        _template_in_person = (defaults, time.monotonic() + TEMPLATE_IN_PERSON_TTL)
+    return defaults
+
+
+def clear_template_in_person_defaults():
+    """Forget the memoized table; the next lookup reloads it."""
+    global _template_in_person
+    _template_in_person = (None, 0.0)
+
+
+def local_day_start(day):
+    """Midnight at the start of ``day`` in the current time zone, as an aware
+    datetime."""
+    return timezone.make_aware(dt.datetime.combine(day, dt.time.min))
+
+
+class MeetingQuerySet(models.QuerySet):
+    """Date filters written as ranges on the raw ``date`` column, so they can
+    use ``meeting_date_idx``. A ``date__date`` lookup would wrap the column in
+    a time-zone conversion and cast that no plain index serves."""
+
+    def upcoming(self, now=None):
+        """Meetings occurring today or later, in the local time zone. A meeting
+        stays listed through the whole day it occurs, not just until its start
+        time, so check-in and late sign-ups still find it."""
+        today = timezone.localtime(now).date() if now else timezone.localdate()
+        return self.filter(date__gte=local_day_start(today))
+
+    def on_day(self, day):
+        """Meetings whose local date is ``day``."""
+        return self.filter(
+            date__gte=local_day_start(day),
+            date__lt=local_day_start(day + dt.timedelta(days=1)),
+        )
+
+
 class Meeting(models.Model):
     """A scheduled club meeting."""
 
@@ -163,6 +233,14 @@ class Meeting(models.Model):
         "attendance/registrant API calls. Keep in sync with the link above.",
     )
 
+    objects = MeetingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Upcoming/past splits and date-range reports.
+            models.Index(fields=["date"], name="meeting_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.date.strftime('%Y-%m-%d')} ({self.meeting_type})"
 
@@ -269,6 +347,19 @@ class MeetingRole(models.Model):
 
     sort_order = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            # "Does this member already hold a role at this meeting?"
+            models.Index(fields=["meeting", "user"], name="meetingrole_meeting_user_idx"),
+            # Open slots of a role at a meeting (sign-up page, invites,
+            # reminders). Partial, so it only holds the few unfilled rows.
+            models.Index(
+                fields=["meeting", "role"],
+                condition=models.Q(user__isnull=True),
+                name="meetingrole_open_slot_idx",
+            ),
+        ]
+
     def clean(self):
         super().clean()
         if self.evaluates_id is None:
@@ -338,7 +429,11 @@ class MeetingRole(models.Model):
 
     def evaluated_by_label(self):
         """For an evaluated row, 'evaluator: <name>'; '' otherwise."""
-        evaluator = self.evaluators.first()
+        if "_paired_evaluator" in self.__dict__:
+            # Attached by resolve_evaluator_pairings().
+            evaluator = self._paired_evaluator
+        else:
+            evaluator = self.evaluators.first()
         if evaluator and evaluator.user:
             u = evaluator.user
             return f"evaluator: {u.first_name} {u.last_name}"
@@ -349,6 +444,29 @@ class MeetingRole(models.Model):
         return f"{self.meeting} - {self.role}: {assigned}"
 
 
+def resolve_evaluator_pairings(roles):
+    """Attach evaluator pairings to a whole meeting's MeetingRole rows so
+    ``evaluating_label()`` and ``evaluated_by_label()`` don't query per row.
+
+    ``roles`` must be every row of the meeting (hidden ones included), loaded
+    with ``user`` selected; pairs are resolved within that set. Each
+    evaluator's ``evaluates`` is pointed at the in-memory target, and each
+    target remembers its first evaluator by pk (what ``evaluators.first()``
+    returns). Returns ``roles``.
+    """
+    by_id = {r.id: r for r in roles}
+    for r in roles:
+        r._paired_evaluator = None
+    for r in sorted(roles, key=lambda r: r.id):
+        target = by_id.get(r.evaluates_id)
+        if target is None:
+            continue
+        r.evaluates = target
+        if target._paired_evaluator is None:
+            target._paired_evaluator = r
+    return roles
+
+
 class Attendance(models.Model):
     """Records who attended a meeting. Links to a User for members, or stores
     guest_name/guest_email for walk-in guests."""
@@ -380,6 +498,12 @@ class Attendance(models.Model):
                 name="unique_member_attendance",
             ),
         ]
+        indexes = [
+            # Admin search by a guest's whole email address (kiosk entries keep
+            # the case the guest typed). Name/email trigram indexes for the
+            # admin's contains-search are PostgreSQL-only (migration 0036).
+            models.Index(Lower("guest_email"), name="attendance_guest_email_lower"),
+        ]
 
     def __str__(self):
         if self.user:
@@ -476,3 +600,10 @@ def send_first_time_role_email_on_assignment(sender, instance, created, raw=Fals
         logger.exception(
             "Failed to send first-time role email for MeetingRole %s", instance.pk
         )
+
+
+@receiver(post_save, sender=MeetingTypeItem)
+@receiver(post_delete, sender=MeetingTypeItem)
+def invalidate_template_in_person(sender, **kwargs):
+    """Drop the memoized template attendance modes when a template item changes."""
+    clear_template_in_person_defaults()
@@ -1,9 +1,38 @@
 from django.contrib.auth import get_user_model
-from django.utils.crypto import get_random_string
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Attendance, MeetingRole
 
 User = get_user_model()
 
 
+def claim_role(assignment, user):
+    """
+    Atomically claims an open MeetingRole for ``user``.
+
+    The slot is taken with a conditional ``UPDATE ... WHERE user_id IS NULL``,
+    so when two members sign up for the same open slot at once exactly one
+    UPDATE matches and the other sees zero rows. The winner's member-entered
+    fields already set on ``assignment`` (attendance mode, notes, Pathways)
+    are then written with a regular ``save()`` so post_save receivers (the
+    first-time role email) still fire.
+
+    Returns True if ``user`` won the slot, False if someone else holds it.
+    On False, ``assignment`` is refreshed to show the current holder.
+    """
+    with transaction.atomic():
+        won = MeetingRole.objects.filter(
+            pk=assignment.pk, user__isnull=True
+        ).update(user=user)
+        if won:
+            assignment.user = user
+            assignment.save()
+            return True
+    assignment.refresh_from_db()
+    return False
+
+
 def convert_guest_attendance_to_user(attendance):
     """
     Converts a guest attendance record to a linked User account.
@@ -11,33 +40,106 @@ def convert_guest_attendance_to_user(attendance):
     """
     if attendance.user or not attendance.guest_email:
         return None, False
+    result = convert_guest_attendances([attendance])
+    return attendance.user, bool(result.created)
 
-    email = attendance.guest_email.strip().lower()
-    first_name = attendance.guest_first_name.strip()
-    last_name = attendance.guest_last_name.strip()
-
-    existing = User.objects.filter(email=email).first()
-    if existing:
-        attendance.user = existing
-        attendance.save()
-        return existing, False
-
-    username = email.split("@")[0]
-    base_username = username
-    counter = 1
-    while User.objects.filter(username=username).exists():
-        username = f"{base_username}{counter}"
-        counter += 1
 
-    new_user = User.objects.create_user(
-        username=username,
-        email=email,
-        password=get_random_string(12),
-        first_name=first_name,
-        last_name=last_name,
-        is_guest=True,
-    )
-
-    attendance.user = new_user
-    attendance.save()
-    return new_user, True
+class GuestConversion:
+    """Outcome of ``convert_guest_attendances``."""
+
+    def __init__(self):
+        self.created = []   # new User accounts
+        self.linked = 0     # attendances linked to an account that already existed
+        self.skipped = 0    # that member is already checked in to that meeting
+
+
+def convert_guest_attendances(attendances):
+    """
+    Converts walk-in guest attendances to linked User accounts in bulk.
+
+    Guest emails are deduped across the selection, so one person who came to
+    several meetings gets one account. Existing accounts are matched by email
+    in one query, taken usernames are fetched in one query per
+    ``_USERNAME_BATCH`` new accounts, new users are written with one
+    ``bulk_create`` (unusable password, ``is_guest=True``) and the
+    attendances relinked with one ``bulk_update``. An attendance whose member
+    is already recorded at that meeting is left alone (``skipped``).
+    Attendances already linked, or without an email, are ignored.
+    """
+    result = GuestConversion()
+    by_email = {}
+    for attendance in attendances:
+        email = (attendance.guest_email or "").strip().lower()
+        if attendance.user_id is None and email:
+            by_email.setdefault(email, []).append(attendance)
+    if not by_email:
+        return result
+
+    with transaction.atomic():
+        users = {u.email: u for u in User.objects.filter(email__in=list(by_email))}
+        new_emails = [e for e in by_email if e not in users]
+        taken = _taken_usernames(e.split("@")[0] for e in new_emails)
+        for email in new_emails:
+            first = by_email[email][0]
+            user = User(
+                username=_unique_username(email.split("@")[0], taken),
+                email=email,
+                first_name=first.guest_first_name.strip(),
+                last_name=first.guest_last_name.strip(),
+                is_guest=True,
+            )
+            user.set_unusable_password()  # guests sign in by magic link
+            result.created.append(user)
+        # Only accounts that already existed can be checked in already.
+        checked_in = set()
+        if users:
+            checked_in = set(
+                Attendance.objects.filter(user__in=list(users.values()))
+                .values_list("meeting_id", "user_id")
+            )
+        User.objects.bulk_create(result.created)
+        for user in result.created:
+            users[user.email] = user
+
+        new_ids = {u.pk for u in result.created}
+        to_link = []
+        for email, group in by_email.items():
+            user = users[email]
+            for attendance in group:
+                key = (attendance.meeting_id, user.pk)
+                if key in checked_in:
+                    result.skipped += 1
+                    continue
+                checked_in.add(key)
+                attendance.user = user
+                to_link.append(attendance)
+                if user.pk not in new_ids:
+                    result.linked += 1
+        Attendance.objects.bulk_update(to_link, ["user"])
+    return result
+
+
+# Username prefixes looked up per query when allocating new usernames.
+_USERNAME_BATCH = 200
+
+
+def _taken_usernames(bases):
+    bases = sorted(set(bases))
+    taken = set()
+    for start in range(0, len(bases), _USERNAME_BATCH):
+        match = Q()
+        for base in bases[start:start + _USERNAME_BATCH]:
+            match |= Q(username__startswith=base)
+        taken.update(User.objects.filter(match).values_list("username", flat=True))
+    return taken
+
+
+def _unique_username(base, taken):
+    """``base``, or ``base1``, ``base2``… — the first not in ``taken`` (which
+    is updated)."""
+    username, counter = base, 1
+    while username in taken:
+        username = f"{base}{counter}"
+        counter += 1
+    taken.add(username)
+    return username
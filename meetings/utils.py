@@ -10,14 +10,16 @@ from members.models import User
 logger = logging.getLogger(__name__)
 
 
-def send_meeting_reminders(meeting, edits=None):
+def send_meeting_reminders(meeting, edits=None, draft=None):
     """Send role reminders (to assignees) and open-role nudges (to everyone
     unassigned). ``edits`` optionally overrides the per-group subject/body
-    templates (supplied by the review-before-send page)."""
+    templates (supplied by the review-before-send page); ``draft`` is the
+    already-built draft, if the caller has one."""
     from .emails import build_reminder_draft
     from communications.emails import build_messages, send_messages
 
-    messages = build_messages(build_reminder_draft(meeting)["groups"], edits)
+    draft = draft or build_reminder_draft(meeting)
+    messages = build_messages(draft["groups"], edits, draft["workflow"], draft["target"])
     try:
         return send_messages(messages)
     except Exception:
@@ -25,13 +27,15 @@ def send_meeting_reminders(meeting, edits=None):
         raise
 
 
-def send_meeting_register_reminders(meeting, edits=None):
+def send_meeting_register_reminders(meeting, edits=None, draft=None):
     """Email remote role-takers who haven't registered on Zoom yet, asking them
-    to register. ``edits`` optionally overrides the subject/body templates."""
+    to register. ``edits`` optionally overrides the subject/body templates;
+    passing the already-built ``draft`` saves a second round of Zoom calls."""
     from .emails import build_register_draft
     from communications.emails import build_messages, send_messages
 
-    messages = build_messages(build_register_draft(meeting)["groups"], edits)
+    draft = draft or build_register_draft(meeting)
+    messages = build_messages(draft["groups"], edits, draft["workflow"], draft["target"])
     try:
         return send_messages(messages)
     except Exception:
@@ -39,20 +43,23 @@ def send_meeting_register_reminders(meeting, edits=None):
         raise
 
 
-def send_meeting_feedback(meeting, edits=None):
+def send_meeting_feedback(meeting, edits=None, draft=None):
     """Send role feedback (members whose ``admin_notes`` is new/changed) and
     guest thank-yous (once per guest), then stamp what went out so repeats
-    don't re-send. ``edits`` optionally overrides the subject/body templates.
-    Returns ``(feedback_count, guest_count)``."""
+    don't re-send. ``edits`` optionally overrides the subject/body templates;
+    ``draft`` is the already-built draft, if the caller has one.
+    Returns the number of emails sent; recipients the OutboundEmail log skips
+    as already sent are not counted."""
     from django.utils import timezone
     from .emails import build_feedback_draft
     from .models import Attendance, MeetingRole
     from communications.emails import build_messages, send_messages
 
-    groups = build_feedback_draft(meeting)["groups"]
-    messages = build_messages(groups, edits)
+    draft = draft or build_feedback_draft(meeting)
+    groups = draft["groups"]
+    messages = build_messages(groups, edits, draft["workflow"], draft["target"])
     try:
-        send_messages(messages)
+        sent = send_messages(messages)
     except Exception:
         logger.exception("Failed to send meeting feedback for %s", meeting)
         raise
@@ -72,7 +79,7 @@ def send_meeting_feedback(meeting, edits=None):
             att.thank_you_sent_at = now
         Attendance.objects.bulk_update(attendances, ["thank_you_sent_at"])
 
-    return len(roles), len(attendances)
+    return sent
 
 
 def send_first_time_role_email(meeting_role):
@@ -150,30 +157,42 @@ def send_first_time_role_email(meeting_role):
     return True
 
 
-def upcoming_meetings_with_open_role(role, now=None):
-    """Upcoming meetings (occurring today or later) that have an unfilled slot
-    for ``role``, earliest first. Used to make a role invite actionable. A
-    meeting stays eligible through the whole day it occurs, not just until its
-    start time."""
-    from django.utils import timezone
-    from .models import Meeting
-
-    now = now or timezone.now()
-    today = timezone.localtime(now).date()
-    return (
-        Meeting.objects.filter(date__date__gte=today,
-                               roles__role=role,
-                               roles__user__isnull=True)
-        .distinct()
-        .order_by("date")
+def upcoming_open_slots_by_role(roles, now=None):
+    """For each of ``roles``, the upcoming meetings (occurring today or later)
+    that have an unfilled slot for it, earliest first, as ``{role_id:
+    [meeting, ...]}``. Roles with nothing open are left out.
+
+    One query for any number of roles, with ``meeting_type`` loaded, so
+    invite drafts and the open-roles lists on activity pages don't query per
+    role or per meeting. A meeting appearing under several roles is the same
+    instance in each list."""
+    from .models import Meeting, MeetingRole
+
+    slots = (
+        MeetingRole.objects.filter(
+            role__in=roles,
+            user__isnull=True,
+            meeting__in=Meeting.objects.upcoming(now),
+        )
+        .select_related("meeting__meeting_type")
+        .order_by("meeting__date", "meeting_id")
     )
+    meetings = {}
+    by_role = {}
+    for slot in slots:
+        meeting = meetings.setdefault(slot.meeting_id, slot.meeting)
+        listed = by_role.setdefault(slot.role_id, [])
+        if not listed or listed[-1] is not meeting:
+            listed.append(meeting)
+    return by_role
 
 
-def send_role_invite(member, roles, edits=None, now=None):
+def send_role_invite(member, roles, edits=None, now=None, draft=None):
     """Invite ``member`` to sign up for one of ``roles`` at an upcoming meeting.
     Lists, per role, the upcoming meetings that currently have it open (generic
-    nudge if none do). ``edits`` optionally overrides the subject/body. Returns
-    the number of distinct open upcoming meetings listed.
+    nudge if none do). ``edits`` optionally overrides the subject/body and
+    ``draft`` is the already-built draft, if the caller has one. Returns the
+    number of distinct open upcoming meetings listed.
 
     The caller is responsible for not inviting when there are no upcoming
     meetings at all (the button is disabled in that case).
@@ -181,8 +200,8 @@ def send_role_invite(member, roles, edits=None, now=None):
     from .emails import build_invite_draft
     from communications.emails import build_messages, send_messages
 
-    draft = build_invite_draft(member, roles, now=now)
-    messages = build_messages(draft["groups"], edits)
+    draft = draft or build_invite_draft(member, roles, now=now)
+    messages = build_messages(draft["groups"], edits, draft["workflow"], draft["target"])
     try:
         send_messages(messages)
     except Exception:
@@ -1,11 +1,7 @@
 import base64
 import io
 import json
-from datetime import timedelta
-from pathlib import Path
 
-import qrcode
-import qrcode.constants
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required, user_passes_test
@@ -16,27 +12,25 @@ from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_POST
-from docx import Document
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-from docx.shared import Inches, Pt
-
-# Vertical gap before/after agenda lines. Kept tight so a typical (trimmed)
-# meeting agenda fits on a single page.
-AGENDA_GAP = Pt(2)
-
-AGENDA_TEMPLATE = (
-    Path(__file__).parent / "templates" / "meetings" / "agenda" / "agenda_template.docx"
-)
 
-from .models import Meeting, MeetingRole, MeetingTypeItem, Attendance
+from .models import (
+    Attendance,
+    Meeting,
+    MeetingRole,
+    resolve_evaluator_pairings,
+    template_in_person_defaults,
+)
+from .services import claim_role
 
 User = get_user_model()
 
 
 def _generate_qr_data_uri(url):
     """Generate a QR code as a base64-encoded PNG data URI."""
+    # qrcode (and Pillow under it) load on the first kiosk render, not at boot.
+    import qrcode
+    import qrcode.constants
+
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_M,
@@ -60,12 +54,15 @@ def _build_agenda_sections(meeting):
     Sessions with takes_roles=False will have an empty roles list.
     Roles not assigned to any session are grouped in a final None section.
     """
-    roles = list(
-        meeting.roles.filter(role__show_on_agenda=True)
-        .select_related("role", "user", "session", "evaluates", "evaluates__user")
-        .prefetch_related("evaluators", "evaluators__user")
-        .order_by("sort_order", "id")
+    # Load every row (hidden roles included) so evaluator pairings resolve
+    # in memory from this one query, then drop the hidden ones.
+    all_roles = resolve_evaluator_pairings(
+        list(
+            meeting.roles.select_related("role", "user", "session")
+            .order_by("sort_order", "id")
+        )
     )
+    roles = [r for r in all_roles if r.role.show_on_agenda]
 
     meeting_sessions = meeting.meeting_sessions.select_related("session").order_by(
         "sort_order"
@@ -102,304 +99,17 @@ def meeting_agenda(request, meeting_id):
     )
 
 
-def _replace_in_paragraph(paragraph, placeholder, replacement):
-    """Replace placeholder text in a paragraph, handling Word's run-splitting."""
-    full_text = "".join(run.text for run in paragraph.runs)
-    if placeholder not in full_text:
-        return False
-    new_text = full_text.replace(placeholder, replacement)
-    # Put all text in the first run (preserves its formatting), clear the rest
-    for i, run in enumerate(paragraph.runs):
-        run.text = new_text if i == 0 else ""
-    return True
-
-
-def _replace_in_run(paragraph, placeholder, replacement):
-    """Replace a placeholder that lives wholly within a single run, preserving
-    that run's formatting (so e.g. a non-bold value stays non-bold next to a
-    bold label). Returns False if the placeholder spans runs (caller can fall
-    back to the run-collapsing _replace_in_paragraph)."""
-    for run in paragraph.runs:
-        if placeholder in run.text:
-            run.text = run.text.replace(placeholder, replacement)
-            return True
-    return False
-
-
-def _remove_paragraph(paragraph):
-    """Remove a paragraph element from the document XML (no-op if already gone)."""
-    p = paragraph._element
-    parent = p.getparent()
-    if parent is not None:
-        parent.remove(p)
-
-
-def _set_table_cell_margins(table, top_pt, bottom_pt, side_twips=108):
-    """Set the table's default cell margins. Top/bottom add a little breathing
-    room above and below each horizontal rule (the row borders); left/right are
-    preserved near Word's default so column spacing is unchanged."""
-    tblPr = table._tbl.tblPr
-    existing = tblPr.find(qn("w:tblCellMar"))
-    if existing is not None:
-        tblPr.remove(existing)
-    mar = OxmlElement("w:tblCellMar")
-    for side, twips in (("top", int(top_pt * 20)), ("left", side_twips),
-                        ("bottom", int(bottom_pt * 20)), ("right", side_twips)):
-        el = OxmlElement(f"w:{side}")
-        el.set(qn("w:w"), str(twips))
-        el.set(qn("w:type"), "dxa")
-        mar.append(el)
-    tblPr.append(mar)
-
-
-def _fit_table_width(table, total_twips):
-    """Rescale the table's columns to span ``total_twips`` (the text-area
-    width), keeping their proportions, and pin the table to a fixed layout at
-    that width. The template grid was sized for the old, wider margins, so
-    without this the table renders narrow and sits offset to the left."""
-    tbl = table._tbl
-    grid = tbl.find(qn("w:tblGrid"))
-    cols = grid.findall(qn("w:gridCol"))
-    widths = [int(c.get(qn("w:w"))) for c in cols]
-    old_total = sum(widths) or 1
-    new = [round(total_twips * w / old_total) for w in widths]
-    new[-1] += total_twips - sum(new)  # absorb rounding into the last column
-    for col, w in zip(cols, new):
-        col.set(qn("w:w"), str(w))
-
-    tblPr = tbl.tblPr
-    tblW = tblPr.find(qn("w:tblW"))
-    if tblW is None:
-        tblW = OxmlElement("w:tblW")
-        tblPr.append(tblW)
-    tblW.set(qn("w:type"), "dxa")
-    tblW.set(qn("w:w"), str(total_twips))
-
-    layout = tblPr.find(qn("w:tblLayout"))
-    if layout is None:
-        layout = OxmlElement("w:tblLayout")
-        tblPr.append(layout)
-    layout.set(qn("w:type"), "fixed")
-
-    for row in table.rows:
-        for cell, w in zip(row.cells, new):
-            tcPr = cell._tc.get_or_add_tcPr()
-            tcW = tcPr.find(qn("w:tcW"))
-            if tcW is None:
-                tcW = OxmlElement("w:tcW")
-                tcPr.insert(0, tcW)
-            tcW.set(qn("w:type"), "dxa")
-            tcW.set(qn("w:w"), str(w))
-
-
-def _add_run(paragraph, text, bold=False, size=None):
-    """Append a run with explicit bold/size so a line can mix bold labels with
-    plain values."""
-    run = paragraph.add_run(text)
-    run.bold = bold
-    if size is not None:
-        run.font.size = size
-    return run
-
-
 def meeting_agenda_download(request, meeting_id):
     """Public endpoint: download the meeting agenda as a Word document."""
-    meeting = get_object_or_404(Meeting, id=meeting_id)
-
-    doc = Document(AGENDA_TEMPLATE)
-
-    # Tighten the layout so a typical (trimmed) meeting fits one page: narrow
-    # margins and a 10pt body font. The template's header runs carry their own
-    # sizes, so this only shrinks the role-list body text.
-    for section in doc.sections:
-        section.top_margin = section.bottom_margin = Inches(0.5)
-        section.left_margin = section.right_margin = Inches(0.6)
-    doc.styles["Normal"].font.size = Pt(10)
-
-    # Required placeholders — always replaced
-    replacements = {
-        "{{DATE}}": meeting.date.strftime("%A, %B %d, %Y"),
-        "{{TIME}}": meeting.date.strftime("%I:%M %p"),
-    }
-
-    # Next meeting (time, date, type) — its line is dropped if none is scheduled.
-    next_meeting = (
-        Meeting.objects.filter(date__gt=meeting.date).order_by("date").first()
-    )
-    next_meeting_text = ""
-    if next_meeting:
-        next_meeting_text = next_meeting.date.strftime("%I:%M %p, %A, %B %d, %Y")
-        if next_meeting.meeting_type:
-            next_meeting_text += f" ({next_meeting.meeting_type})"
-
-    # Theme / Word-of-the-day share one template line. Rebuild it in code so
-    # each label is bold but its value is not, and an empty field (with its
-    # label) drops out. header_size is captured here and reused for the Zoom
-    # link so the two match.
-    header_segments = [("Theme: ", meeting.theme),
-                       ("Word of the Day: ", meeting.word_of_the_day)]
-    header_size = Pt(10)
-
-    paragraphs_to_remove = []
-    for paragraph in doc.paragraphs:
-        for placeholder, value in replacements.items():
-            _replace_in_paragraph(paragraph, placeholder, value)
-
-        text = "".join(run.text for run in paragraph.runs)
-
-        if "{{THEME}}" in text or "{{WORD_OF_THE_DAY}}" in text:
-            if paragraph.runs and paragraph.runs[0].font.size:
-                header_size = paragraph.runs[0].font.size
-            filled = [(label, value) for label, value in header_segments if value]
-            for run in list(paragraph.runs):
-                run._element.getparent().remove(run._element)
-            if not filled:
-                paragraphs_to_remove.append(paragraph)
-            else:
-                for i, (label, value) in enumerate(filled):
-                    if i:
-                        _add_run(paragraph, ", ", size=header_size)
-                    _add_run(paragraph, label, bold=True, size=header_size)
-                    _add_run(paragraph, value, size=header_size)
-            continue
-
-        # Next meeting: replace within its own (non-bold) run so the value
-        # stays plain next to the bold "NEXT MEETING:" label; drop the line if
-        # there is no next meeting.
-        if "{{NEXT_MEETING}}" in text:
-            if next_meeting_text:
-                if not _replace_in_run(paragraph, "{{NEXT_MEETING}}", next_meeting_text):
-                    _replace_in_paragraph(paragraph, "{{NEXT_MEETING}}", next_meeting_text)
-            else:
-                paragraphs_to_remove.append(paragraph)
-
-    for p in paragraphs_to_remove:
-        _remove_paragraph(p)
-
-    # Populate the 2-column table (session | roles)
-    sections = _build_agenda_sections(meeting)
-    table = doc.tables[0]
-    # A little breathing room above/below each horizontal rule (row border).
-    _set_table_cell_margins(table, top_pt=3, bottom_pt=3)
-
-    # Running clock: the first session starts 5 minutes after the meeting time,
-    # and each session then advances by its own duration.
-    current_time = meeting.date + timedelta(minutes=5)
-
-    first = True
-    for section in sections:
-        session = section["session"]
-        if first:
-            row_cells = table.rows[0].cells
-            first = False
-        else:
-            row_cells = table.add_row().cells
-
-        # Cell 0: session name, then "start time, duration - note" beneath it.
-        c = row_cells[0]
-        p1 = c.paragraphs[0]
-        p1.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-        p1.paragraph_format.space_before = AGENDA_GAP
-        if session:
-            r = p1.add_run(session.name)
-            detail = current_time.strftime("%I:%M %p")
-            if session.duration_minutes:
-                detail += f", {session.duration_minutes} min"
-            if section["note"]:
-                detail += f" - {section['note']}"
-            p2 = c.add_paragraph()
-            p2.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-            p2.paragraph_format.space_after = AGENDA_GAP
-            p2.add_run(detail)
-            current_time += timedelta(minutes=session.duration_minutes or 0)
-        else:
-            r = p1.add_run("Other")
-        r.bold = True
-
-        # Cell 1: a main line per role (Role: Member (In Person) N min), with
-        # optional italic follow-up lines for evaluator pairing and notes.
-        c = row_cells[1]
-        if section["roles"]:
-            first_role = True
-            for assignment in section["roles"]:
-                if first_role:
-                    p = c.paragraphs[0]
-                    first_role = False
-                else:
-                    p = c.add_paragraph()
-                p.paragraph_format.space_before = AGENDA_GAP
-
-                member = (
-                    f"{assignment.user.first_name} {assignment.user.last_name}"
-                    if assignment.user
-                    else "(Open)"
-                )
-                run = p.add_run(f"{assignment.role.name}: ")
-                run.bold = True
-                p.add_run(member)
-
-                # In-person status in brackets next to the name: [L] in
-                # person, [R] remote, [-] unknown.
-                mode = {True: "L", False: "R"}.get(assignment.in_person, "-")
-                p.add_run(f" [{mode}]")
-                duration = assignment.duration_label()
-                if duration:
-                    p.add_run(f" {duration}")
-
-                # Report each evaluator pairing once, from the evaluator's
-                # side ("evaluating <speaker>"); the reverse "evaluator: <name>"
-                # line on the speaker's row would just duplicate it.
-                for label in (
-                    assignment.evaluating_label(),
-                    assignment.agenda_notes(),
-                ):
-                    if label:
-                        c.add_paragraph().add_run(label).italic = True
-
-            c.paragraphs[-1].paragraph_format.space_after = AGENDA_GAP
-        elif session and not session.takes_roles:
-            p = c.paragraphs[0]
-            p.paragraph_format.space_before = AGENDA_GAP
-            p.paragraph_format.space_after = AGENDA_GAP
-            p.add_run(section["note"] or "Break")
-
-    # The template grid was sized for the old margins; rescale it to fill the
-    # current text area so the table isn't offset to the left.
-    sec = doc.sections[0]
-    text_twips = round(
-        (int(sec.page_width) - int(sec.left_margin) - int(sec.right_margin)) / 635
-    )
-    _fit_table_width(table, text_twips)
-
-    # Final merged row welcoming members who joined within ~3 months (90 days)
-    # before this meeting. Omitted entirely when there are none.
-    meeting_day = meeting.date.date()
-    newest = (
-        get_user_model().objects.filter(
-            is_active=True, is_guest=False,
-            join_date__gt=meeting_day - timedelta(days=90),
-            join_date__lte=meeting_day,
-        )
-        .order_by("join_date", "last_name", "first_name")
-    )
-    names = [f"{u.first_name} {u.last_name}".strip() for u in newest]
-    if names:
-        welcome = table.add_row()
-        cell = welcome.cells[0].merge(welcome.cells[1])
-        para = cell.paragraphs[0]
-        para.paragraph_format.space_before = AGENDA_GAP
-        para.paragraph_format.space_after = AGENDA_GAP
-        label = para.add_run("Welcome to our newest Speak Up members: ")
-        label.bold = True
-        para.add_run(", ".join(names))
+    # Imported here so python-docx loads on the first download, not at boot.
+    from .agenda_docx import build_agenda_docx
 
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
+    meeting = get_object_or_404(Meeting, id=meeting_id)
+    content = build_agenda_docx(meeting, _build_agenda_sections(meeting))
 
     filename = f"agenda-{meeting.date.strftime('%Y-%m-%d')}.docx"
     response = HttpResponse(
-        buffer.getvalue(),
+        content,
         content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
     )
     response["Content-Disposition"] = f'attachment; filename="{filename}"'
@@ -410,11 +120,8 @@ def role_signups(request):
     """Role sign-up page: upcoming meetings with their role tables. Logged-in
     members claim or drop roles here; anonymous visitors see a read-only
     roster."""
-    # Keep a meeting listed through the whole day it occurs; drop it the next
-    # day. Comparing the calendar date (not the datetime) avoids hiding a
-    # meeting once its start time has passed earlier that same day.
     meetings_qs = (
-        Meeting.objects.filter(date__date__gte=timezone.localdate())
+        Meeting.objects.upcoming()
         .order_by("date")
         .prefetch_related("meeting_sessions__session")
     )
@@ -462,9 +169,60 @@ def _single_holder_siblings(assignment):
     configured so one member fills them all. Empty for ordinary roles."""
     if not assignment.role.single_holder_all_slots:
         return MeetingRole.objects.none()
-    return MeetingRole.objects.filter(
-        meeting_id=assignment.meeting_id, role_id=assignment.role_id
-    ).exclude(pk=assignment.pk)
+    return (
+        MeetingRole.objects.filter(
+            meeting_id=assignment.meeting_id, role_id=assignment.role_id
+        )
+        .exclude(pk=assignment.pk)
+        .select_related("role", "user", "evaluates__user")
+    )
+
+
+# Every field a member sets on a slot (see _clear_member_fields and
+# _mirror_member_fields); the columns a slot-group update writes.
+MEMBER_FIELDS = [
+    "user",
+    "in_person",
+    "notes",
+    "pathways_path",
+    "pathways_level",
+    "pathways_project",
+]
+
+
+def _update_slot_group(siblings, apply):
+    """Apply ``apply(slot)`` to each linked single-holder slot and write them
+    all with one ``bulk_update``. Returns the updated rows for the out-of-band
+    HTMX swaps.
+
+    ``bulk_update`` skips post_save, so the first-time role email is checked
+    once by the caller's ``save()`` of the primary slot — the siblings share
+    its (user, role), so checking them again would only re-query
+    RoleGuideEmailLog.
+    """
+    siblings = list(siblings)
+    for slot in siblings:
+        apply(slot)
+    if siblings:
+        MeetingRole.objects.bulk_update(siblings, MEMBER_FIELDS)
+    return siblings
+
+
+def _claim_slot_group(assignment, slots):
+    """Give every still-open slot in ``slots`` to ``assignment``'s member,
+    copying its member-entered fields. ``slots`` may be stale, so the write is
+    one conditional ``UPDATE ... WHERE user_id IS NULL`` (as in
+    ``claim_role``): a slot someone else claimed meanwhile keeps its holder.
+    Returns the rows actually claimed, for the out-of-band HTMX swaps."""
+    ids = [slot.pk for slot in slots]
+    if not ids:
+        return []
+    MeetingRole.objects.filter(pk__in=ids, user__isnull=True).update(
+        **{field: getattr(assignment, field) for field in MEMBER_FIELDS}
+    )
+    return list(
+        _single_holder_siblings(assignment).filter(pk__in=ids, user=assignment.user)
+    )
 
 
 def _clear_member_fields(slot):
@@ -516,17 +274,15 @@ def _template_in_person(assignment):
     """Default attendance mode for an assignment, read from its template.
 
     Looks up ``MeetingTypeItem.in_person`` for this assignment's
-    (meeting_type, role). Falls back to True when the meeting has no
-    ``meeting_type`` or no matching template item.
+    (meeting_type, role) in the cached template table. Falls back to True
+    when the meeting has no ``meeting_type`` or no matching template item.
     """
     meeting_type_id = assignment.meeting.meeting_type_id
     if not meeting_type_id:
         return True
-    mti = MeetingTypeItem.objects.filter(
-        meeting_type_id=meeting_type_id,
-        role=assignment.role,
-    ).first()
-    return mti.in_person if mti else True
+    return template_in_person_defaults().get(
+        (meeting_type_id, assignment.role_id), True
+    )
 
 
 @login_required
@@ -578,11 +334,10 @@ def toggle_role(request, role_id):
         # role, drop every slot this member holds in the meeting at once.
         _clear_member_fields(assignment)
         assignment.save()
-        dropped = []
-        for sib in _single_holder_siblings(assignment).filter(user=request.user):
-            _clear_member_fields(sib)
-            sib.save()
-            dropped.append(sib)
+        dropped = _update_slot_group(
+            _single_holder_siblings(assignment).filter(user=request.user),
+            _clear_member_fields,
+        )
         return _role_row_response(request, assignment, oob_rows=dropped)
 
     elif assignment.user is None:
@@ -618,16 +373,23 @@ def toggle_role(request, role_id):
                 },
             )
 
-        assignment.user = request.user
         _apply_signup_fields(assignment, request)
-        assignment.save()
+        if not claim_role(assignment, request.user):
+            # Lost a race: another member claimed the slot between this page
+            # loading and the POST. Show them who has it instead.
+            return _role_row_response(
+                request,
+                assignment,
+                {
+                    "showAlert": "Sorry, someone else just signed up for this role.",
+                    "closeModal": True,
+                },
+            )
         # For a single-holder role, claim every other open slot too, copying
         # the same attendance/notes so they stay in sync.
-        filled = []
-        for sib in _single_holder_siblings(assignment).filter(user__isnull=True):
-            _mirror_member_fields(assignment, sib)
-            sib.save()
-            filled.append(sib)
+        filled = _claim_slot_group(
+            assignment, _single_holder_siblings(assignment).filter(user__isnull=True)
+        )
         return _role_row_response(
             request, assignment, {"closeModal": True}, oob_rows=filled
         )
@@ -652,11 +414,10 @@ def save_role_details(request, role_id):
     assignment.save()
 
     # Keep linked single-holder slots held by the same member in sync.
-    edited = []
-    for sib in _single_holder_siblings(assignment).filter(user=assignment.user):
-        _mirror_member_fields(assignment, sib)
-        sib.save()
-        edited.append(sib)
+    edited = _update_slot_group(
+        _single_holder_siblings(assignment).filter(user=assignment.user),
+        lambda sib: _mirror_member_fields(assignment, sib),
+    )
 
     return _role_row_response(
         request, assignment, {"closeModal": True}, oob_rows=edited
@@ -665,11 +426,10 @@ def save_role_details(request, role_id):
 
 def checkin_kiosk(request):
     """Displays the check-in grid for today's meeting (or the next upcoming one)."""
-    today = timezone.localdate()
-    meeting = Meeting.objects.filter(date__date=today).first()
+    meeting = Meeting.objects.on_day(timezone.localdate()).first()
 
     if not meeting:
-        meeting = Meeting.objects.filter(date__gte=today).order_by("date").first()
+        meeting = Meeting.objects.upcoming().order_by("date").first()
 
     context = {"meeting": meeting}
 
@@ -26,8 +26,8 @@ User = get_user_model()
 def _render_account(request, *, profile_form=None, password_form=None, email_form=None):
     # The member is already authenticated here, so password setting doesn't
     # require the current password (SetPasswordForm). This matters because most
-    # members reach this page via a magic link and were issued a random password
-    # at account creation that they've never known.
+    # members reach this page via a magic link and have never had a password
+    # (bulk-created accounts start with an unusable one).
     user = request.user
     context = {
         "profile_form": profile_form or ProfileForm(instance=user),
@@ -91,7 +91,7 @@ def account_email_confirm(request, token):
         return redirect("account")
 
     # Re-check availability in case the address was taken since the link was sent.
-    if User.objects.filter(email__iexact=new_email).exclude(pk=user.pk).exists():
+    if User.objects.filter(email=new_email.lower()).exclude(pk=user.pk).exists():
         messages.error(request, "That email address is now in use; change not applied.")
         return redirect("account")
 
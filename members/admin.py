@@ -1,10 +1,18 @@
-from django.contrib import admin
+import io
+
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.forms import UserCreationForm
-from django.urls import path
-from import_export.admin import ImportExportModelAdmin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect
+from django.shortcuts import render
+from django.urls import path, reverse
+from import_export.admin import ExportMixin
+
+from core.search import IndexedSearchMixin
 
 from .emails import send_welcome_email
+from .importer import import_members
 from .models import User
 from .resources import UserResource
 from .views import activity_report, activity_report_detail
@@ -93,7 +101,7 @@ def send_welcome_emails(modeladmin, request, queryset):
     modeladmin.message_user(request, msg)
 
 
-class CustomUserAdmin(ImportExportModelAdmin, UserAdmin):
+class CustomUserAdmin(IndexedSearchMixin, ExportMixin, UserAdmin):
     # Custom changelist template injects an "Activity report" link in the
     # object-tools row, alongside Django's stock "Add user" button.
     change_list_template = "members/admin/user_change_list.html"
@@ -168,11 +176,14 @@ class CustomUserAdmin(ImportExportModelAdmin, UserAdmin):
         return actions
 
     def has_import_permission(self, request):
-        # CSV import can set is_staff / is_officer, so it stays superuser-only.
+        # Guards the streaming import page (django-import-export's own import
+        # view isn't mounted; see import_members_view). The CSV can set
+        # is_staff / is_officer, so it stays superuser-only.
         return request.user.is_superuser
 
     # Search bar capability
     search_fields = ("username", "first_name", "last_name", "email")
+    search_email_fields = ("email",)
 
     actions = [make_guest, remove_guest, make_officer, remove_officer, make_active, remove_active, send_welcome_emails]
 
@@ -192,9 +203,62 @@ class CustomUserAdmin(ImportExportModelAdmin, UserAdmin):
                 self.admin_site.admin_view(activity_report_detail),
                 name="members_user_activity_report_detail",
             ),
+            path(
+                "import-members/",
+                self.admin_site.admin_view(self.import_members_view),
+                name="members_user_import_members",
+            ),
         ]
         return custom + urls
 
+    def import_members_view(self, request):
+        """Upload a roster CSV and run it through the streaming importer
+        (``members.importer``) — validated and written a chunk at a time."""
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+        if request.method == "POST" and request.FILES.get("csv_file"):
+            upload = request.FILES["csv_file"]
+            lines = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            try:
+                summary = import_members(lines)
+            except (ValueError, UnicodeDecodeError) as e:
+                # Raised before the first row is read, so nothing was saved.
+                self.message_user(
+                    request, f"Import failed, nothing was saved: {e}", messages.ERROR)
+            else:
+                if summary.stopped:
+                    # Chunks before the bad line are already committed.
+                    self.message_user(
+                        request,
+                        f"Import incomplete. {summary.stopped}. "
+                        f"{summary.created} new and {summary.updated} updated "
+                        f"member(s) were saved before it stopped.",
+                        messages.ERROR,
+                    )
+                else:
+                    self.message_user(
+                        request,
+                        f"Imported {summary.created} new and updated "
+                        f"{summary.updated} member(s).",
+                        messages.SUCCESS,
+                    )
+                if summary.error_count:
+                    shown = "; ".join(
+                        f"line {line}: {msg}" for line, msg in summary.errors[:10])
+                    self.message_user(
+                        request,
+                        f"Skipped {summary.error_count} row(s) with errors — {shown}",
+                        messages.WARNING,
+                    )
+                return HttpResponseRedirect(reverse("admin:members_user_changelist"))
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Import members",
+            "opts": self.model._meta,
+            "columns": UserResource.Meta.fields,
+        }
+        return render(request, "members/admin/import_members.html", context)
+
 
 
 # admin.site.unregister(User) # Unregister the default if needed, though we didn't use the default
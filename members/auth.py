@@ -28,7 +28,9 @@ class EmailBackend(ModelBackend):
             return None
 
         try:
-            user = User.objects.get(email__iexact=username.strip())
+            # Emails are stored lowercased, so an exact match on the lowercased
+            # input is case-insensitive and uses the unique index.
+            user = User.objects.get(email=username.strip().lower())
         except User.DoesNotExist:
             # Run the default hasher once to keep timing comparable to the
             # success path, mitigating user-enumeration via response time.
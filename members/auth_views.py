@@ -29,7 +29,7 @@ def magic_link_request(request):
 
     email = (request.POST.get("email") or "").strip().lower()
     if email:
-        user = User.objects.filter(email__iexact=email, is_active=True).first()
+        user = User.objects.filter(email=email, is_active=True).first()
         if user is not None:
             _send_login_link(request, user)
 
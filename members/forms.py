@@ -7,6 +7,7 @@ from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import (
     AuthenticationForm,
+    PasswordResetForm as AuthPasswordResetForm,
     SetPasswordForm as AuthSetPasswordForm,
 )
 
@@ -39,6 +40,17 @@ class EmailAuthenticationForm(AuthenticationForm):
         self.fields["password"].widget.attrs.update({"class": "form-control"})
 
 
+class PasswordResetForm(AuthPasswordResetForm):
+    """"Forgot your password?" for every active member. Django's form skips
+    accounts with an unusable password, but that's how imported members and
+    converted guests start out (they sign in by magic link), and the reset is
+    how they set their first password."""
+
+    def get_users(self, email):
+        return User._default_manager.filter(
+            email=email.strip().lower(), is_active=True)
+
+
 class ProfileForm(_BootstrapMixin, forms.ModelForm):
     """Self-service editing of the member's own name."""
 
@@ -71,6 +83,6 @@ class EmailChangeForm(forms.Form):
         email = self.cleaned_data["new_email"].strip().lower()
         if email == (self.user.email or "").lower():
             raise forms.ValidationError("That's already your email address.")
-        if User.objects.filter(email__iexact=email).exclude(pk=self.user.pk).exists():
+        if User.objects.filter(email=email).exclude(pk=self.user.pk).exists():
             raise forms.ValidationError("That email address is already in use.")
         return email
@@ -0,0 +1,166 @@
+"""Streaming CSV import for the member roster.
+
+``import_members`` reads an uploaded roster line by line instead of loading it
+whole, ``CHUNK_SIZE`` rows at a time. Each chunk is validated, then written
+with one ``bulk_create`` (new usernames) and one ``bulk_update`` (existing
+ones) inside a transaction, so memory stays flat and a large upload finishes
+well inside the worker timeout. Rows that fail validation are reported by
+line number and skipped; the rest of their chunk is still written.
+
+Columns follow ``UserResource`` (the django-import-export resource it
+replaces in the admin): rows are matched on ``username``, normalized by the
+same ``normalize_row``, new members get an unusable password, and only the
+columns present in the file are written to existing members. Bulk writes skip
+post_save, so officer status (``is_staff`` + the Officers group) is synced
+by ``sync_officers`` for just the chunk's rows, in the same transaction as
+the write; members the file doesn't mention are never touched.
+
+Chunks commit as they go. If the file turns out to be unreadable part way
+through (bad encoding, broken quoting), the import stops there and
+``ImportSummary.stopped`` says where; the created/updated counts are the rows
+already saved. A chunk whose bulk write the database rejects is rolled back
+and its rows reported as errors.
+"""
+
+import csv
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from import_export.widgets import BooleanWidget, DateWidget
+
+from .resources import UserResource, normalize_row
+from .signals import sync_officers
+
+User = get_user_model()
+
+CHUNK_SIZE = 500
+
+# Errors kept for display; the total is still counted.
+MAX_REPORTED_ERRORS = 50
+
+FIELDS = UserResource.Meta.fields
+# Always written: ``normalize_row`` fills them in when the column is missing.
+_DEFAULTED = ("is_guest", "is_officer", "is_staff")
+_BOOLEAN = BooleanWidget()
+_DATE = DateWidget()
+
+
+class ImportSummary:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []  # (line number, message), first MAX_REPORTED_ERRORS
+        self.stopped = None  # why the import ended early, if it did
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def import_members(lines, chunk_size=CHUNK_SIZE):
+    """Import members from ``lines`` (any iterable of CSV text lines, header
+    first) and return an ``ImportSummary``."""
+    reader = csv.DictReader(lines)
+    headers = [h.strip() for h in reader.fieldnames or []]
+    if "username" not in headers and "email" not in headers:
+        raise ValueError("The CSV needs a username or email column.")
+    reader.fieldnames = headers
+    fields = [f for f in FIELDS if f != "username" and (f in headers or f in _DEFAULTED)]
+
+    summary = ImportSummary()
+    seen_usernames, seen_emails = set(), set()
+    rows = ((reader.line_num, row) for row in reader)
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            _import_chunk(chunk, fields, summary, seen_usernames, seen_emails)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Earlier chunks are committed, officer sync included.
+        summary.stopped = f"Stopped reading after line {reader.line_num}: {e}"
+    return summary
+
+
+def _clean_row(row, fields):
+    values = {"username": (row.get("username") or "").strip()}
+    for name in fields:
+        raw = (row.get(name) or "").strip()
+        if name in _DEFAULTED:
+            values[name] = bool(_BOOLEAN.clean(raw))
+        elif name == "join_date":
+            values[name] = _DATE.clean(raw) if raw else None
+        else:
+            values[name] = raw
+    return values
+
+
+def _import_chunk(chunk, fields, summary, seen_usernames, seen_emails):
+    parsed = []
+    for line, row in chunk:
+        normalize_row(row)
+        try:
+            values = _clean_row(row, fields)
+        except ValueError as e:
+            summary.error(line, str(e))
+            continue
+        username, email = values["username"], values.get("email")
+        if username in seen_usernames:
+            summary.error(line, f"Username {username!r} appears earlier in the file.")
+            continue
+        if email and email in seen_emails:
+            summary.error(line, f"Email {email!r} appears earlier in the file.")
+            continue
+        seen_usernames.add(username)
+        if email:
+            seen_emails.add(email)
+        parsed.append((line, values))
+
+    existing = User.objects.in_bulk(
+        [values["username"] for _, values in parsed], field_name="username")
+    email_owners = dict(User.objects.filter(
+        email__in=[values["email"] for _, values in parsed if values.get("email")],
+    ).values_list("email", "username"))
+    exclude = [f.name for f in User._meta.concrete_fields
+               if f.name != "username" and f.name not in fields]
+
+    to_create, to_update, pending_lines = [], [], []
+    for line, values in parsed:
+        owner = email_owners.get(values.get("email"))
+        if owner and owner != values["username"]:
+            summary.error(line, f"Email {values['email']!r} already belongs to {owner!r}.")
+            continue
+        user = existing.get(values["username"])
+        if user is None:
+            if not values.get("email"):
+                # Only caught by the unique email index otherwise, for the
+                # whole chunk.
+                summary.error(line, "email: New members need an email address.")
+                continue
+            user = User(**values)
+            user.set_unusable_password()
+        else:
+            for name in fields:
+                setattr(user, name, values[name])
+        try:
+            user.clean_fields(exclude=exclude)
+        except ValidationError as e:
+            summary.error(line, "; ".join(
+                f"{field}: {' '.join(msgs)}" for field, msgs in e.message_dict.items()))
+            continue
+        (to_update if user.pk else to_create).append(user)
+        pending_lines.append(line)
+
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(to_create)
+            if to_update:
+                User.objects.bulk_update(to_update, fields)
+            sync_officers([user.pk for user in to_create + to_update])
+    except IntegrityError as e:
+        for line in pending_lines:
+            summary.error(line, f"Not saved, the database rejected this chunk: {e}")
+        return
+    summary.created += len(to_create)
+    summary.updated += len(to_update)
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:45
+
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+from core.db import trigram_indexes
+
+
+def lowercase_emails(apps, schema_editor):
+    """Lowercase any email written since 0004 by a path that skipped
+    ``User.save()``, so the LOWER(email) constraint matches the column.
+
+    Addresses that differ only by case can't both survive, and which account
+    to keep is an officer's call, so they are listed and the migration stops
+    before changing anything."""
+    User = apps.get_model("members", "User")
+    clashes = (
+        User.objects.exclude(email="")
+        .values(lowered=Lower("email"))
+        .annotate(accounts=Count("id"))
+        .filter(accounts__gt=1)
+        .values_list("lowered", flat=True)
+    )
+    rows = list(
+        User.objects.annotate(lowered=Lower("email"))
+        .filter(lowered__in=list(clashes))
+        .order_by("lowered", "id")
+        .values_list("username", "email")
+    )
+    if rows:
+        listing = "\n".join(f"  {username}: {email}" for username, email in rows)
+        raise RuntimeError(
+            "These accounts have emails that differ only by case. Merge or "
+            "change them so each address is unique, then migrate again:\n"
+            + listing
+        )
+    User.objects.exclude(email="").exclude(email=Lower("email")).update(
+        email=Lower("email")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("members", "0006_backfill_join_dates"),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="user_email_lower_uniq",
+            ),
+        ),
+        # PostgreSQL only; both are no-ops on SQLite.
+        TrigramExtension(),
+        migrations.RunPython(
+            *trigram_indexes(
+                "members_user", ["username", "first_name", "last_name", "email"]
+            )
+        ),
+    ]
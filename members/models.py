@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 
 
@@ -29,6 +30,15 @@ class User(AbstractUser):
         "self", null=True, blank=True, on_delete=models.SET_NULL, related_name="mentees"
     )
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Case-insensitive uniqueness even for writes that skip save()
+            # (bulk_create/update). Also serves LOWER(email) lookups such as
+            # the admin's email search. Username/name/email trigram indexes
+            # for admin search are PostgreSQL-only (migration 0007).
+            models.UniqueConstraint(Lower("email"), name="user_email_lower_uniq"),
+        ]
+
     @property
     def status_label(self):
         if self.is_guest:
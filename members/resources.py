@@ -1,12 +1,32 @@
 from import_export import resources, fields
 from import_export.widgets import BooleanWidget
 from django.contrib.auth import get_user_model
-from django.contrib.auth.hashers import make_password
-from django.utils.crypto import get_random_string
 
 User = get_user_model()
 
 
+def normalize_row(row):
+    """Auto-generate username from email and default is_guest to True.
+    Shared by the django-import-export resource and the streaming importer
+    (``members.importer``)."""
+    # Normalize email to lowercase so the unique constraint behaves
+    # case-insensitively (matches User.save()).
+    if row.get("email"):
+        row["email"] = row["email"].strip().lower()
+
+    if "email" in row and not row.get("username"):
+        row["username"] = row["email"].split("@")[0]
+
+    if not row.get("is_guest"):
+        row["is_guest"] = "1"
+
+    if not row.get("is_officer"):
+        row["is_officer"] = "0"
+
+    if not row.get("is_staff"):
+        row["is_staff"] = "0"
+
+
 class UserResource(resources.ModelResource):
     """Handles CSV import/export of User records via django-import-export."""
 
@@ -37,25 +57,11 @@ class UserResource(resources.ModelResource):
         exclude = ("password", "is_superuser", "groups", "user_permissions")
 
     def before_import_row(self, row, **kwargs):
-        """Auto-generate username from email and default is_guest to True."""
-        # Normalize email to lowercase so the unique constraint behaves
-        # case-insensitively (matches User.save()).
-        if row.get("email"):
-            row["email"] = row["email"].strip().lower()
-
-        if "email" in row and not row.get("username"):
-            row["username"] = row["email"].split("@")[0]
-
-        if not row.get("is_guest"):
-            row["is_guest"] = "1"
-
-        if not row.get("is_officer"):
-            row["is_officer"] = "0"
-
-        if not row.get("is_staff"):
-            row["is_staff"] = "0"
+        normalize_row(row)
 
     def before_save_instance(self, instance, row, **kwargs):
-        """Assign a random password to newly imported users."""
+        """Give newly imported users an unusable password: they sign in by
+        magic link (or "Forgot your password?"), and unlike hashing a random
+        one this costs nothing per row."""
         if not instance.pk and not instance.password:
-            instance.password = make_password(get_random_string(12))
+            instance.set_unusable_password()
@@ -11,7 +11,9 @@ post_save handler keeps two derived facts in lockstep:
 
 The bulk admin actions in ``members/admin.py`` were rewritten to iterate and
 call ``.save()`` per row so this signal fires for them; plain
-``queryset.update()`` would bypass it.
+``queryset.update()`` would bypass it. The streaming CSV import writes with
+``bulk_create``/``bulk_update`` instead and calls ``sync_officers()`` for the
+rows each chunk wrote.
 """
 from django.contrib.auth.models import Group
 from django.db.models.signals import post_save
@@ -39,3 +41,26 @@ def sync_officer_membership(sender, instance, **kwargs):
             User.objects.filter(pk=instance.pk).update(is_staff=False)
             instance.is_staff = False
         instance.groups.remove(officers_group)
+
+
+def sync_officers(pks=None):
+    """Set-based ``sync_officer_membership`` for bulk writes that bypass
+    post_save (the streaming CSV import): the users with these ``pks``, or
+    every user if None. A fixed handful of queries no matter how many users
+    changed."""
+    officers_group, _ = Group.objects.get_or_create(name=OFFICERS_GROUP_NAME)
+    users = User.objects.all() if pks is None else User.objects.filter(pk__in=pks)
+    users.filter(is_officer=True, is_staff=False).update(is_staff=True)
+    users.filter(
+        is_officer=False, is_staff=True, is_superuser=False).update(is_staff=False)
+
+    Membership = User.groups.through
+    missing = (users.filter(is_officer=True)
+               .exclude(groups=officers_group).values_list("pk", flat=True))
+    Membership.objects.bulk_create(
+        [Membership(user_id=pk, group_id=officers_group.pk) for pk in missing],
+        ignore_conflicts=True)
+    memberships = Membership.objects.filter(group=officers_group, user__is_officer=False)
+    if pks is not None:
+        memberships = memberships.filter(user_id__in=pks)
+    memberships.delete()
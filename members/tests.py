@@ -1,10 +1,17 @@
 from datetime import timedelta
+from functools import partial
+from importlib import import_module
+from io import StringIO
+from unittest.mock import patch
 
+import tablib
 from django.contrib.auth.models import Group
 from django.core import mail
-from django.db import IntegrityError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
 from django.test import TestCase, override_settings
-from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
 from django.utils import timezone
 
 from meetings.models import Meeting, MeetingRole, Role
@@ -14,6 +21,8 @@ from django.contrib.auth import authenticate
 from .admin import CustomUserCreationForm, make_officer, remove_officer
 from .models import User
 from .emails import send_welcome_email
+from .importer import import_members
+from .resources import UserResource
 from .signals import OFFICERS_GROUP_NAME
 from .tokens import make_email_change_token, make_login_token
 
@@ -37,6 +46,13 @@ class EmailBackendTest(TestCase):
             authenticate(username="Member@Example.COM", password="secret"), self.user
         )
 
+    def test_lookup_is_exact_match_on_lowercased_email(self):
+        with CaptureQueriesContext(connection) as ctx:
+            authenticate(username=" Member@Example.COM ", password="secret")
+        sql = ctx.captured_queries[0]["sql"]
+        self.assertIn("\"email\" = 'member@example.com'", sql)
+        self.assertNotIn("UPPER", sql)
+
     def test_wrong_password_rejected(self):
         self.assertIsNone(
             authenticate(username="member@example.com", password="nope")
@@ -124,6 +140,173 @@ class MagicLinkTest(TestCase):
         self.assertEqual(resp.status_code, 400)
 
 
+class ProvisionedAccountTest(TestCase):
+    """Imported members start with an unusable password (no hashing); magic
+    links and "Forgot your password?" still work for them."""
+
+    def _import(self, *emails):
+        dataset = tablib.Dataset(
+            *[(e.split("@")[0], e, "New") for e in emails],
+            headers=["username", "email", "first_name"])
+        UserResource().import_data(dataset, dry_run=False, raise_errors=True)
+
+    def test_import_sets_unusable_password(self):
+        with patch("django.contrib.auth.hashers.PBKDF2PasswordHasher.encode") as encode:
+            self._import("a@example.com", "b@example.com")
+        encode.assert_not_called()
+        users = User.objects.filter(email__in=["a@example.com", "b@example.com"])
+        self.assertEqual(len(users), 2)
+        self.assertFalse(any(u.has_usable_password() for u in users))
+        self.assertNotEqual(users[0].password, users[1].password)
+
+    def test_magic_link_still_bound_to_password(self):
+        self._import("a@example.com")
+        user = User.objects.get(email="a@example.com")
+        token = make_login_token(user)
+        user.set_password("now-i-have-one-42")
+        user.save()
+        resp = self.client.get(reverse("magic_link_login", args=[token]))
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.get(reverse("magic_link_login", args=[make_login_token(user)]))
+        self.assertEqual(resp.status_code, 302)
+
+    def test_password_reset_reaches_unusable_password_accounts(self):
+        self._import("a@example.com")
+        self.client.post(reverse("password_reset"), {"email": "A@example.com"})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["a@example.com"])
+
+
+class StreamingMemberImportTest(TestCase):
+    """members.importer: chunked validation, bulk writes, one officer sync."""
+
+    HEADER = "username,email,first_name,is_guest,is_officer,join_date\n"
+
+    def _run(self, body, **kwargs):
+        return import_members(StringIO(self.HEADER + body).readlines(), **kwargs)
+
+    def test_creates_and_updates(self):
+        User.objects.create_user("alice", "alice@example.com", "pw", first_name="Al")
+        summary = self._run(
+            "alice,alice@example.com,Alice,0,0,2024-01-05\n"
+            ",Bob@Example.com,Bob,,,\n")
+        self.assertEqual((summary.created, summary.updated, summary.error_count), (1, 1, 0))
+        alice = User.objects.get(username="alice")
+        self.assertEqual(alice.first_name, "Alice")
+        self.assertEqual(alice.join_date.isoformat(), "2024-01-05")
+        self.assertTrue(alice.check_password("pw"))  # untouched
+        bob = User.objects.get(username="bob")
+        self.assertEqual(bob.email, "bob@example.com")
+        self.assertTrue(bob.is_guest)
+        self.assertFalse(bob.has_usable_password())
+
+    def test_officers_synced_for_imported_rows_only(self):
+        User.objects.create_user("old", "old@example.com", is_officer=True)
+        # Not in the file: a staff flag set outside the officer sync stays.
+        outsider = User.objects.create_user("desk", "desk@example.com")
+        User.objects.filter(pk=outsider.pk).update(is_staff=True)
+        summary = self._run(
+            "carol,carol@example.com,Carol,0,1,\n"
+            "old,old@example.com,Old,0,0,\n")
+        self.assertEqual(summary.error_count, 0)
+        group = Group.objects.get(name=OFFICERS_GROUP_NAME)
+        carol, old = User.objects.get(username="carol"), User.objects.get(username="old")
+        self.assertTrue(carol.is_staff)
+        self.assertIn(group, carol.groups.all())
+        self.assertFalse(old.is_staff)
+        self.assertNotIn(group, old.groups.all())
+        outsider.refresh_from_db()
+        self.assertTrue(outsider.is_staff)
+
+    def test_bad_rows_reported_and_rest_written(self):
+        User.objects.create_user("taken", "taken@example.com")
+        summary = self._run(
+            "ok1,ok1@example.com,A,,,\n"
+            "bad,not-an-email,B,,,\n"
+            "dup,taken@example.com,C,,,\n"
+            "ok1,other@example.com,D,,,\n"
+            "late,late@example.com,E,,,31/31/2024\n"
+            "ok2,ok2@example.com,F,,,\n", chunk_size=2)
+        self.assertEqual(summary.created, 2)
+        errors = dict(summary.errors)
+        self.assertEqual(sorted(errors), [3, 4, 5, 6])
+        self.assertIn("already belongs to 'taken'", errors[4])
+        self.assertIn("appears earlier", errors[5])
+        self.assertTrue(User.objects.filter(username="ok2").exists())
+
+    def test_new_members_without_email_reported_per_row(self):
+        User.objects.create_user("known", "known@example.com")
+        summary = import_members(StringIO(
+            "username,first_name\nknown,Kay\nnew1,A\nnew2,B\n").readlines())
+        self.assertEqual((summary.created, summary.updated), (0, 1))
+        self.assertEqual([line for line, _ in summary.errors], [3, 4])
+        self.assertIn("need an email", summary.errors[0][1])
+        self.assertEqual(User.objects.get(username="known").first_name, "Kay")
+
+    def test_rejected_chunk_reported_not_raised(self):
+        with patch.object(User.objects, "bulk_create", side_effect=IntegrityError("dup")):
+            summary = self._run("a,a@example.com,A,,,\nb,b@example.com,B,,,\n")
+        self.assertEqual((summary.created, summary.error_count), (0, 2))
+        self.assertIn("dup", summary.errors[0][1])
+
+    def test_unreadable_line_keeps_earlier_chunks_and_syncs_officers(self):
+        def lines():
+            yield self.HEADER
+            yield "carol,carol@example.com,Carol,0,1,\n"
+            raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+
+        summary = import_members(lines(), chunk_size=1)
+        self.assertEqual(summary.created, 1)
+        self.assertIn("after line 2", summary.stopped)
+        carol = User.objects.get(username="carol")
+        self.assertTrue(carol.is_staff)
+        self.assertTrue(carol.groups.filter(name=OFFICERS_GROUP_NAME).exists())
+
+    def test_changelist_offers_only_the_streaming_import(self):
+        self.client.force_login(User.objects.create_superuser("root", "root@example.com", "pw"))
+        resp = self.client.get(reverse("admin:members_user_changelist"))
+        self.assertContains(resp, reverse("admin:members_user_import_members"))
+        self.assertContains(resp, reverse("admin:members_user_export"))
+        # django-import-export's row-by-row import view is not mounted.
+        with self.assertRaises(NoReverseMatch):
+            reverse("admin:members_user_import")
+
+    def test_admin_reports_rows_saved_before_an_unreadable_line(self):
+        self.client.force_login(User.objects.create_superuser("root", "root@example.com", "pw"))
+        upload = SimpleUploadedFile("roster.csv", (
+            self.HEADER + "".join(f"m{i},m{i}@example.com,M,0,0,\n" for i in range(400))
+        ).encode() + b"fay,fay@example.com,F\xe9,0,0,\n")
+        with patch("members.admin.import_members", partial(import_members, chunk_size=100)):
+            resp = self.client.post(
+                reverse("admin:members_user_import_members"), {"csv_file": upload}, follow=True)
+        # The decoder reads ahead, so it fails a few hundred rows early.
+        saved = User.objects.filter(username__startswith="m").count()
+        self.assertGreater(saved, 0)
+        self.assertContains(resp, "Import incomplete")
+        self.assertContains(resp, f"{saved} new and 0 updated member(s) were saved")
+
+    def test_queries_do_not_grow_per_row(self):
+        body = "".join(f"u{i},u{i}@example.com,U{i},0,0,\n" for i in range(40))
+        with CaptureQueriesContext(connection) as ctx:
+            self._run(body, chunk_size=20)
+        self.assertEqual(User.objects.filter(username__startswith="u").count(), 40)
+        self.assertLess(len(ctx), 30)
+
+    def test_admin_upload_superuser_only(self):
+        officer = User.objects.create_user("off", "off@example.com", "pw", is_officer=True)
+        self.client.force_login(officer)
+        url = reverse("admin:members_user_import_members")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(User.objects.create_superuser("root", "root@example.com", "pw"))
+        upload = SimpleUploadedFile(
+            "roster.csv", (self.HEADER + "dan,dan@example.com,Dan,0,0,\n").encode())
+        resp = self.client.post(url, {"csv_file": upload}, follow=True)
+        self.assertContains(resp, "Imported 1 new and updated 0 member(s).")
+        self.assertTrue(User.objects.filter(email="dan@example.com").exists())
+
+
+
 class AccountPageTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -278,6 +461,35 @@ class EmailUniquenessTest(TestCase):
                 username="bob", password="pass", email="ALICE@example.com"
             )
 
+    def test_case_difference_caught_without_save(self):
+        # bulk_create skips save()'s lowercasing; the LOWER(email) constraint
+        # still rejects the duplicate.
+        User.objects.create_user(username="alice", email="alice@example.com")
+        with self.assertRaises(IntegrityError):
+            User.objects.bulk_create([User(username="bob", email="ALICE@example.com")])
+
+    def test_email_migration_lists_case_only_duplicates(self):
+        from django.apps import apps
+
+        migration = import_module("members.migrations.0007_email_search_indexes")
+        # Legacy data from before the LOWER(email) index (rolled back with
+        # the test).
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX user_email_lower_uniq")
+        User.objects.create_user(username="alice", email="alice@example.com")
+        bob = User.objects.create_user(username="bob", email="bob@example.com")
+        User.objects.filter(pk=bob.pk).update(email="Alice@Example.com")
+
+        with self.assertRaisesMessage(RuntimeError, "bob: Alice@Example.com") as cm:
+            migration.lowercase_emails(apps, None)
+        self.assertIn("alice: alice@example.com", str(cm.exception))
+        # Nothing was changed.
+        self.assertEqual(User.objects.get(pk=bob.pk).email, "Alice@Example.com")
+
+        User.objects.filter(pk=bob.pk).update(email="Bob@Example.com")
+        migration.lowercase_emails(apps, None)
+        self.assertEqual(User.objects.get(pk=bob.pk).email, "bob@example.com")
+
     def test_admin_add_form_requires_email(self):
         form = CustomUserCreationForm(
             data={"username": "newuser", "password1": "x", "password2": "x"}
@@ -607,3 +819,14 @@ class MyActivityTest(TestCase):
         resp = self.client.get(reverse("my_activity"))
         breakdown = {r["role"].name: r for r in resp.context["role_breakdown"]}
         self.assertEqual(breakdown["Timer"]["count"], 0)    # Bob's, not Alice's
+
+    def test_lists_upcoming_meetings_with_role_open(self):
+        soon = Meeting.objects.create(date=timezone.now() + timedelta(days=7))
+        MeetingRole.objects.create(meeting=soon, role=self.timer)
+        MeetingRole.objects.create(meeting=soon, role=self.tm, user=self.bob)
+        self.client.force_login(self.alice)
+        resp = self.client.get(reverse("my_activity"))
+        breakdown = {r["role"].name: r for r in resp.context["role_breakdown"]}
+        self.assertEqual(breakdown["Timer"]["open_meetings"], [soon])
+        self.assertEqual(breakdown["Toastmaster"]["open_meetings"], [])
+        self.assertContains(resp, soon.date.strftime("%b %-d"))
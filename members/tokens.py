@@ -24,7 +24,8 @@ _EMAIL_SALT = "members.email-change"
 def _password_fingerprint(user):
     """A short, stable fingerprint of the password hash. Including it in the
     login token means a password change (or reset) invalidates outstanding
-    magic links."""
+    magic links. Unusable passwords (``!`` plus random characters, as given to
+    imported members) fingerprint the same way."""
     return (user.password or "")[-16:]
 
 
@@ -17,7 +17,7 @@ aggregation with the officer detail view.
 """
 
 from collections import defaultdict
-from datetime import date, datetime, time, timedelta
+from datetime import datetime, timedelta
 from urllib.parse import urlencode
 
 from django.contrib import admin
@@ -27,7 +27,8 @@ from django.db.models import Count, Max, Q
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
 
-from meetings.models import Attendance, Meeting, MeetingRole, Role
+from meetings.models import Attendance, Meeting, MeetingRole, Role, local_day_start
+from meetings.utils import upcoming_open_slots_by_role
 
 from .models import User
 
@@ -76,19 +77,8 @@ def _aware_range_bounds(start_date, end_date):
     DateTimeField). ``end`` is the next day's 00:00 so the whole end-of-range
     day is included.
     """
-    tz = timezone.get_current_timezone()
-    start_dt = (
-        timezone.make_aware(datetime.combine(start_date, time.min), tz)
-        if start_date
-        else None
-    )
-    end_dt = (
-        timezone.make_aware(
-            datetime.combine(date.fromordinal(end_date.toordinal() + 1), time.min), tz
-        )
-        if end_date
-        else None
-    )
+    start_dt = local_day_start(start_date) if start_date else None
+    end_dt = local_day_start(end_date + timedelta(days=1)) if end_date else None
     return start_dt, end_dt
 
 
@@ -202,21 +192,22 @@ def _member_activity(member, start_dt=None, end_dt=None):
             count=Count("id"), last_taken=Max("meeting__date")
         )
     }
+    # Alongside, the upcoming meetings where each role is still open — one
+    # query for all roles.
+    roles = list(Role.objects.filter(show_on_agenda=True).order_by("name"))
+    open_by_role = upcoming_open_slots_by_role(roles)
     role_breakdown = []
-    for role in Role.objects.filter(show_on_agenda=True).order_by("name"):
+    for role in roles:
         agg = taken.get(role.id)
         role_breakdown.append({
             "role": role,
             "count": agg["count"] if agg else 0,
             "last_taken": agg["last_taken"] if agg else None,
+            "open_meetings": open_by_role.get(role.id, []),
         })
 
-    # Invites are pointless with no upcoming meeting to sign up for. Count a
-    # meeting as upcoming through the whole day it occurs, matching the invite
-    # query in upcoming_meetings_with_open_role.
-    upcoming_exists = Meeting.objects.filter(
-        date__date__gte=timezone.localdate()
-    ).exists()
+    # Invites are pointless with no upcoming meeting to sign up for.
+    upcoming_exists = Meeting.objects.upcoming().exists()
 
     return {
         "meeting_rows": meeting_rows,